@@ -1,12 +1,17 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from datetime import date, datetime, timedelta
 from bson import ObjectId
-from app.core.database import get_database
-from app.core.dependencies import get_current_user
+from app.core.database import analytics_reads_primary, get_analytics_database
+from app.core.dependencies import analytics_conditional_get, get_current_user
+from app.core.response_cache import response_cache
 from app.models.user import User
-from app.services.streak_service import get_streak
-from app.services.schedule_service import is_scheduled_on
+from app.services.streak_service import get_streak, get_streaks
+from app.services.completion_service import build_completion_matrix
+from app.services.purge_service import NOT_DELETED
+from app.services.rollup_service import completed_checkins, get_daily_stats
+from app.services.version_service import get_data_version
 
 router = APIRouter()
 
@@ -21,16 +26,28 @@ TIPS_POOL = [
     "Weekly review: notice which weekday you perform best and protect that day.",
     "One habit at 100% is better than five at 20%. Focus wins.",
 ]
+RECENT_CHECKINS_LIMIT = 30
 
 
 @router.get("/habits/{habit_id}")
 async def get_habit_analytics(
     habit_id: str,
     current_user: User = Depends(get_current_user),
+    etag: Optional[str] = Depends(analytics_conditional_get),
     days: int = 30,
 ):
-    db = get_database()
-    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)})
+    user_id = ObjectId(current_user.id)
+    cache_key = response_cache.key(
+        "habit_analytics",
+        {"habit_id": habit_id, "days": days},
+        await get_data_version(user_id),
+        analytics_reads_primary(),
+    )
+    cached = await response_cache.lookup(user_id, cache_key)
+    if cached is not None:
+        return cached
+    db = get_analytics_database()
+    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED})
     if not habit:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
     
@@ -49,11 +66,11 @@ async def get_habit_analytics(
     completed_count = sum(1 for c in checkins if c.get("completed", False))
     completion_rate = (completed_count / total_days * 100) if total_days > 0 else 0
     
-    streak_data = await get_streak(ObjectId(current_user.id), ObjectId(habit_id))
+    streak_data = await get_streak(ObjectId(current_user.id), ObjectId(habit_id), habit.get("frequency", "daily"))
     
     skipped_count = sum(1 for c in checkins if c.get("skipped", False))
     
-    return {
+    return await response_cache.store(user_id, cache_key, {
         "habit_id": habit_id,
         "completion_rate": round(completion_rate, 2),
         "completed_count": completed_count,
@@ -70,7 +87,7 @@ async def get_habit_analytics(
             }
             for c in checkins
         ],
-    }
+    })
 
 
 def _to_date(d) -> date:
@@ -86,81 +103,134 @@ def _to_date(d) -> date:
 @router.get("/heatmap")
 async def get_heatmap(
     current_user: User = Depends(get_current_user),
+    etag: Optional[str] = Depends(analytics_conditional_get),
     days: int = 365,
+    granularity: Literal["day", "week", "month"] = "day",
 ):
-    db = get_database()
+    user_id = ObjectId(current_user.id)
+    cache_key = response_cache.key(
+        "heatmap",
+        {"days": days, "granularity": granularity},
+        await get_data_version(user_id),
+        analytics_reads_primary(),
+    )
+    cached = await response_cache.lookup(user_id, cache_key)
+    if cached is not None:
+        return cached
+    db = get_analytics_database()
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    checkins = await db.checkins.find({
-        "user_id": ObjectId(current_user.id),
-        "date": {"$gte": start_datetime, "$lte": end_datetime},
-        "completed": True,
-    }).to_list(length=10000)
-    
-    heatmap_data = {}
-    for checkin in checkins:
-        d = _to_date(checkin["date"])
-        date_str = d.strftime("%Y-%m-%d")
-        if date_str not in heatmap_data:
-            heatmap_data[date_str] = 0
-        heatmap_data[date_str] += 1
-    
-    return {
+
+    buckets = await db.daily_stats.aggregate([
+        {"$match": {
+            "user_id": user_id,
+            "day": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()},
+            "completed": {"$gt": 0},
+        }},
+        {"$group": {
+            "_id": {"$dateTrunc": {"date": "$date", "unit": granularity, "startOfWeek": "monday"}},
+            "count": {"$sum": "$completed"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]).to_list(length=None)
+
+    return await response_cache.store(user_id, cache_key, {
         "start_date": str(start_date),
         "end_date": str(end_date),
-        "data": heatmap_data,
-    }
+        "granularity": granularity,
+        "data": {_to_date(b["_id"]).strftime("%Y-%m-%d"): b["count"] for b in buckets},
+    })
+
+
+async def _recent_checkins(user_id: ObjectId, habit_ids: List[ObjectId], limit: int) -> Dict[ObjectId, List[dict]]:
+    if not habit_ids:
+        return {}
+    db = get_analytics_database()
+    groups = await db.checkins.aggregate([
+        {"$match": {"user_id": user_id, "habit_id": {"$in": habit_ids}}},
+        {"$sort": {"user_id": 1, "habit_id": 1, "date": -1}},
+        {"$group": {
+            "_id": "$habit_id",
+            "checkins": {"$firstN": {
+                "input": {"date": "$date", "completed": "$completed", "skipped": "$skipped"},
+                "n": limit,
+            }},
+        }},
+    ]).to_list(length=None)
+    return {g["_id"]: g["checkins"] for g in groups}
+
+
+def _habit_insights(habit: dict, checkins: List[dict]) -> List[dict]:
+    insights = []
+    habit_id = habit["_id"]
+    if len(checkins) == 0:
+        return insights
+    completed_count = sum(1 for c in checkins if c.get("completed", False) and not c.get("skipped", False))
+    if completed_count > 0:
+        insights.append({
+            "habit_id": str(habit_id),
+            "habit_name": habit["name"],
+            "type": "recent_activity",
+            "message": f"In the last {len(checkins)} check-ins, you completed «{habit['name']}» {completed_count} time(s).",
+        })
+    if len(checkins) < 3:
+        return insights
+    weekday_completion = {i: 0 for i in range(7)}
+    weekday_total = {i: 0 for i in range(7)}
+    for checkin in checkins:
+        checkin_date = _to_date(checkin.get("date"))
+        if not isinstance(checkin_date, date):
+            continue
+        weekday = checkin_date.weekday()
+        weekday_total[weekday] += 1
+        if checkin.get("completed", False):
+            weekday_completion[weekday] += 1
+    best_weekday = max(
+        range(7),
+        key=lambda d: weekday_completion[d] / weekday_total[d] if weekday_total[d] > 0 else 0,
+    )
+    if weekday_total[best_weekday] > 0:
+        insights.append({
+            "habit_id": str(habit_id),
+            "habit_name": habit["name"],
+            "type": "best_weekday",
+            "message": f"You complete «{habit['name']}» most often on {WEEKDAY_NAMES[best_weekday]}.",
+        })
+    return insights
 
 
 @router.get("/insights")
 async def get_insights(
     current_user: User = Depends(get_current_user),
+    etag: Optional[str] = Depends(analytics_conditional_get),
 ):
-    db = get_database()
     user_id = ObjectId(current_user.id)
-    habits = await db.habits.find({"user_id": user_id, "archived": False}).to_list(length=100)
+    cache_key = response_cache.key(
+        "insights", {}, await get_data_version(user_id), analytics_reads_primary()
+    )
+    cached = await response_cache.lookup(user_id, cache_key)
+    if cached is not None:
+        return cached
+    db = get_analytics_database()
+    habits = await db.habits.find({"user_id": user_id, "archived": False, **NOT_DELETED}).to_list(length=100)
     today = date.today()
     week_start = today - timedelta(days=today.weekday())
     week_end = today
-    start_dt = datetime.combine(week_start, datetime.min.time())
-    end_dt = datetime.combine(week_end, datetime.max.time())
-    week_checkins = await db.checkins.find({
-        "user_id": user_id,
-        "date": {"$gte": start_dt, "$lte": end_dt},
-        "completed": True,
-    }).to_list(length=500)
-    by_date: Dict[str, set] = {}
-    for c in week_checkins:
-        d = _to_date(c["date"])
-        key = d.strftime("%Y-%m-%d")
-        if key not in by_date:
-            by_date[key] = set()
-        by_date[key].add(str(c["habit_id"]))
-    total_scheduled = 0
-    total_completed = 0
-    perfect_days = 0
-    d = week_start
-    while d <= week_end:
-        scheduled_ids = [
-            str(h["_id"]) for h in habits
-            if is_scheduled_on(h.get("schedule"), d)
-        ]
-        total_scheduled += len(scheduled_ids)
-        key = d.strftime("%Y-%m-%d")
-        completed_ids = by_date.get(key) or set()
-        total_completed += sum(1 for hid in scheduled_ids if hid in completed_ids)
-        if scheduled_ids and all(hid in completed_ids for hid in scheduled_ids):
-            perfect_days += 1
-        d += timedelta(days=1)
+    habit_ids = [h["_id"] for h in habits]
+    week_stats, streaks, recent = await asyncio.gather(
+        get_daily_stats(user_id, week_start, week_end),
+        get_streaks(user_id, [(h["_id"], h.get("frequency", "daily")) for h in habits]),
+        _recent_checkins(user_id, habit_ids, RECENT_CHECKINS_LIMIT),
+    )
+    week_matrix = build_completion_matrix(habits, completed_checkins(week_stats), week_start, week_end)
+    total_scheduled = int(week_matrix.scheduled_count.sum())
+    total_completed = int(week_matrix.done_count.sum())
+    perfect_days = int(week_matrix.all_done.sum())
     week_completion_pct = round((total_completed / total_scheduled * 100), 1) if total_scheduled else 0
     best_streak_habit = None
     best_streak_value = 0
     for habit in habits:
-        streak_data = await get_streak(user_id, habit["_id"])
-        cur = streak_data.get("current_streak") or 0
+        cur = streaks[habit["_id"]].get("current_streak") or 0
         if cur > best_streak_value:
             best_streak_value = cur
             best_streak_habit = habit["name"]
@@ -206,51 +276,9 @@ async def get_insights(
     })
     insights = []
     for habit in habits:
-        habit_id = habit["_id"]
-        checkins = await db.checkins.find({
-            "user_id": user_id,
-            "habit_id": habit_id,
-        }).sort("date", -1).limit(30).to_list(length=30)
-        if len(checkins) == 0:
-            continue
-        completed_count = sum(1 for c in checkins if c.get("completed", False) and not c.get("skipped", False))
-        if completed_count > 0:
-            insights.append({
-                "habit_id": str(habit_id),
-                "habit_name": habit["name"],
-                "type": "recent_activity",
-                "message": f"In the last {len(checkins)} check-ins, you completed «{habit['name']}» {completed_count} time(s).",
-            })
-        if len(checkins) < 3:
-            continue
-        weekday_completion = {i: 0 for i in range(7)}
-        weekday_total = {i: 0 for i in range(7)}
-        for checkin in checkins:
-            checkin_date = checkin["date"]
-            if isinstance(checkin_date, datetime):
-                weekday = checkin_date.weekday()
-            elif isinstance(checkin_date, date):
-                weekday = checkin_date.weekday()
-            elif isinstance(checkin_date, str):
-                weekday = datetime.strptime(checkin_date[:10], "%Y-%m-%d").weekday()
-            else:
-                continue
-            weekday_total[weekday] += 1
-            if checkin.get("completed", False):
-                weekday_completion[weekday] += 1
-        best_weekday = max(
-            range(7),
-            key=lambda d: weekday_completion[d] / weekday_total[d] if weekday_total[d] > 0 else 0,
-        )
-        if weekday_total[best_weekday] > 0:
-            insights.append({
-                "habit_id": str(habit_id),
-                "habit_name": habit["name"],
-                "type": "best_weekday",
-                "message": f"You complete «{habit['name']}» most often on {WEEKDAY_NAMES[best_weekday]}.",
-            })
-    return {
+        insights.extend(_habit_insights(habit, recent.get(habit["_id"], [])))
+    return await response_cache.store(user_id, cache_key, {
         "summary": summary,
         "tips": tips,
         "insights": insights,
-    }
+    })
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from datetime import timedelta
 from app.core.config import settings
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import check_password, hash_password, create_access_token
 from app.core.dependencies import get_current_user
 from app.core.database import get_database
 from app.models.user import User, UserCreate, UserResponse
@@ -19,7 +19,7 @@ async def register(user_data: UserCreate):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    password_hash = get_password_hash(user_data.password)
+    password_hash = await hash_password(user_data.password)
     from datetime import datetime
     user_dict = {
         "_id": ObjectId(),
@@ -36,7 +36,7 @@ async def register(user_data: UserCreate):
 async def login(user_data: UserCreate):
     db = get_database()
     user = await db.users.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    if not user or not await check_password(user_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
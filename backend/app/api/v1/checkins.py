@@ -1,16 +1,44 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Optional, Dict
-from datetime import date, datetime, timedelta
+import base64
+import json
+import orjson
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, List, Optional, Dict, Tuple, Union
+from datetime import date, datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.core.database import get_database
-from app.core.dependencies import get_current_user
+from app.core.dependencies import NDJSON_MEDIA_TYPE, conditional_get, get_current_user, negotiate_media_type
+from app.core.serialization import CHECKIN_PROJECTION, checkin_to_json
 from app.models.user import User
-from app.models.checkin import Checkin, CheckinCreate, CheckinResponse
-from app.services.streak_service import update_streak, get_streak
-from app.services.schedule_service import is_scheduled_on
+from app.models.checkin import (
+    Checkin,
+    CheckinBulkCreate,
+    CheckinBulkItemResult,
+    CheckinBulkResponse,
+    CheckinCreate,
+    CheckinResponse,
+    DayCompletion,
+)
+from app.services.streak_service import rebuild_streaks, update_streak, get_streak
+from app.services.schedule_service import compile_schedule, is_scheduled_on
+from app.services.completion_service import build_completion_matrix
+from app.services.version_service import bump_data_version
+from app.services.bitmap_service import record_checkin_bitmap, record_checkin_bitmaps
+from app.services.purge_service import NOT_DELETED, deleted_habit_ids
+from app.services.rollup_service import (
+    completed_checkins,
+    get_daily_stats,
+    record_checkin_change,
+    record_checkin_changes,
+)
 
 router = APIRouter()
 
+CHECKINS_PAGE_SIZE = 1000
+CHECKINS_STREAM_BATCH_SIZE = 500
+
 
 def datetime_to_date(dt):
     if isinstance(dt, datetime):
@@ -20,13 +48,41 @@ def datetime_to_date(dt):
     return dt
 
 
+async def _upsert_checkin(
+    user_id: ObjectId,
+    habit_id: ObjectId,
+    day: date,
+    fields: Dict[str, Any],
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    db = get_database()
+    on_insert = {
+        "_id": ObjectId(),
+        "date": datetime.combine(day, datetime.min.time()),
+        "created_at": datetime.utcnow(),
+    }
+    key = {"user_id": user_id, "habit_id": habit_id, "day": day.isoformat()}
+    for attempt in range(2):
+        try:
+            before = await db.checkins.find_one_and_update(
+                key,
+                {"$set": fields, "$setOnInsert": on_insert},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+    return before, {**(before or {**key, **on_insert}), **fields}
+
+
 @router.post("/", response_model=CheckinResponse, status_code=status.HTTP_201_CREATED)
 async def create_checkin(
     checkin_data: CheckinCreate,
     current_user: User = Depends(get_current_user),
 ):
     db = get_database()
-    habit = await db.habits.find_one({"_id": ObjectId(checkin_data.habit_id), "user_id": ObjectId(current_user.id)})
+    habit = await db.habits.find_one({"_id": ObjectId(checkin_data.habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED})
     if not habit:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
 
@@ -36,42 +92,34 @@ async def create_checkin(
     if not is_scheduled_on(habit.get("schedule"), checkin_data.date):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Habit is not scheduled for this date")
     
-    checkin_date_start = datetime.combine(checkin_data.date, datetime.min.time())
-    checkin_date_end = datetime.combine(checkin_data.date, datetime.max.time())
-    existing = await db.checkins.find_one({
-        "user_id": ObjectId(current_user.id),
-        "habit_id": ObjectId(checkin_data.habit_id),
-        "date": {"$gte": checkin_date_start, "$lte": checkin_date_end},
-    })
-    
-    if existing:
-        update_data = {
+    existing, checkin = await _upsert_checkin(
+        ObjectId(current_user.id),
+        ObjectId(checkin_data.habit_id),
+        checkin_data.date,
+        {
             "completed": checkin_data.completed,
             "value": checkin_data.value,
             "skipped": checkin_data.skipped,
-        }
-        await db.checkins.update_one({"_id": existing["_id"]}, {"$set": update_data})
-        checkin = await db.checkins.find_one({"_id": existing["_id"]})
-    else:
-        checkin_date_dt = datetime.combine(checkin_data.date, datetime.min.time())
-        checkin_dict = {
-            "_id": ObjectId(),
-            "user_id": ObjectId(current_user.id),
-            "habit_id": ObjectId(checkin_data.habit_id),
-            "date": checkin_date_dt,
-            "completed": checkin_data.completed,
-            "value": checkin_data.value,
-            "skipped": checkin_data.skipped,
-            "created_at": datetime.utcnow(),
-        }
-        await db.checkins.insert_one(checkin_dict)
-        checkin = checkin_dict
-    
+        },
+    )
+
+    await record_checkin_change(
+        ObjectId(current_user.id),
+        ObjectId(checkin_data.habit_id),
+        checkin_data.date,
+        existing,
+        checkin,
+    )
+    await record_checkin_bitmap(ObjectId(current_user.id), ObjectId(checkin_data.habit_id), checkin_data.date, checkin)
     habit_frequency = habit.get("frequency", "daily")
-    if checkin_data.completed and not checkin_data.skipped:
-        await update_streak(ObjectId(current_user.id), ObjectId(checkin_data.habit_id), checkin_data.date, True, habit_frequency)
-    elif checkin_data.skipped:
-        await update_streak(ObjectId(current_user.id), ObjectId(checkin_data.habit_id), checkin_data.date, False, habit_frequency)
+    await update_streak(
+        ObjectId(current_user.id),
+        ObjectId(checkin_data.habit_id),
+        checkin_data.date,
+        checkin_data.completed and not checkin_data.skipped,
+        habit_frequency,
+    )
+    await bump_data_version(ObjectId(current_user.id))
     
     checkin_date = datetime_to_date(checkin["date"])
     return CheckinResponse(
@@ -86,57 +134,199 @@ async def create_checkin(
     )
 
 
-@router.get("/day-completion", response_model=Dict[str, bool])
+@router.post("/bulk", response_model=CheckinBulkResponse)
+async def create_checkins_bulk(
+    payload: CheckinBulkCreate,
+    current_user: User = Depends(get_current_user),
+):
+    db = get_database()
+    user_id = ObjectId(current_user.id)
+    items = payload.checkins
+    today = date.today()
+    results: List[Optional[CheckinBulkItemResult]] = [None] * len(items)
+
+    requested_ids = {ObjectId(item.habit_id) for item in items if ObjectId.is_valid(item.habit_id)}
+    habits = {
+        h["_id"]: h
+        for h in await db.habits.find(
+            {"_id": {"$in": list(requested_ids)}, "user_id": user_id, **NOT_DELETED},
+            {"schedule": 1, "frequency": 1},
+        ).to_list(length=None)
+    }
+
+    accepted: Dict[Tuple[ObjectId, date], int] = {}
+    for i, item in enumerate(items):
+        habit = habits.get(ObjectId(item.habit_id)) if ObjectId.is_valid(item.habit_id) else None
+        if not habit:
+            results[i] = CheckinBulkItemResult(index=i, status="error", detail="Habit not found")
+            continue
+        if item.date > today:
+            results[i] = CheckinBulkItemResult(index=i, status="error", detail="Cannot create check-in in the future")
+            continue
+        if not compile_schedule(habit.get("schedule")).is_scheduled(item.date):
+            results[i] = CheckinBulkItemResult(index=i, status="error", detail="Habit is not scheduled for this date")
+            continue
+        key = (habit["_id"], item.date)
+        if key in accepted:
+            results[accepted[key]] = CheckinBulkItemResult(index=accepted[key], status="superseded")
+        accepted[key] = i
+
+    if accepted:
+        days = [day for _, day in accepted]
+        existing = {
+            (c["habit_id"], datetime_to_date(c["date"])): c
+            for c in await db.checkins.find(
+                {
+                    "user_id": user_id,
+                    "habit_id": {"$in": list({habit_id for habit_id, _ in accepted})},
+                    "date": {
+                        "$gte": datetime.combine(min(days), datetime.min.time()),
+                        "$lte": datetime.combine(max(days), datetime.max.time()),
+                    },
+                },
+                {"habit_id": 1, "date": 1, "completed": 1, "skipped": 1},
+            ).to_list(length=None)
+        }
+
+        now = datetime.utcnow()
+        writes = []
+        ops = []
+        for (habit_id, day), i in accepted.items():
+            item = items[i]
+            fields = {
+                "completed": item.completed,
+                "value": item.value,
+                "skipped": item.skipped,
+                "day": day.isoformat(),
+            }
+            prior = existing.get((habit_id, day))
+            if prior:
+                writes.append(UpdateOne({"_id": prior["_id"]}, {"$set": fields}))
+                checkin_id = prior["_id"]
+            else:
+                checkin_id = ObjectId()
+                writes.append(UpdateOne(
+                    {"user_id": user_id, "habit_id": habit_id, "day": day.isoformat()},
+                    {
+                        "$set": fields,
+                        "$setOnInsert": {
+                            "_id": checkin_id,
+                            "date": datetime.combine(day, datetime.min.time()),
+                            "created_at": now,
+                        },
+                    },
+                    upsert=True,
+                ))
+            ops.append((i, habit_id, day, prior, fields, checkin_id))
+
+        failed: Dict[int, str] = {}
+        try:
+            await db.checkins.bulk_write(writes, ordered=False)
+        except BulkWriteError as exc:
+            failed = {e["index"]: e.get("errmsg", "Write failed") for e in exc.details.get("writeErrors", [])}
+
+        changes = []
+        affected: Dict[ObjectId, str] = {}
+        for op_index, (i, habit_id, day, prior, fields, checkin_id) in enumerate(ops):
+            if op_index in failed:
+                results[i] = CheckinBulkItemResult(index=i, status="error", detail=failed[op_index])
+                continue
+            results[i] = CheckinBulkItemResult(
+                index=i,
+                status="updated" if prior else "created",
+                id=str(checkin_id),
+            )
+            changes.append((habit_id, day, prior, fields))
+            affected[habit_id] = habits[habit_id].get("frequency", "daily")
+
+        await record_checkin_changes(user_id, changes)
+        await record_checkin_bitmaps(user_id, [(habit_id, day, fields) for habit_id, day, _, fields in changes])
+        await rebuild_streaks(user_id, list(affected.items()))
+        if changes:
+            await bump_data_version(user_id)
+
+    return CheckinBulkResponse(results=results)
+
+
+@router.get("/day-completion", response_model=Union[Dict[str, bool], Dict[str, DayCompletion]])
 async def get_day_completion(
     start_date: date,
     end_date: date,
+    include_ratio: bool = False,
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
 ):
     db = get_database()
     user_id = ObjectId(current_user.id)
-    habits = await db.habits.find({"user_id": user_id, "archived": {"$ne": True}}).to_list(length=500)
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(end_date, datetime.max.time())
-    checkins = await db.checkins.find({
-        "user_id": user_id,
-        "completed": True,
-        "date": {"$gte": start_dt, "$lte": end_dt},
-    }).to_list(length=5000)
-    checkins_by_date: Dict[str, set] = {}
-    for c in checkins:
-        d = datetime_to_date(c["date"])
-        key = d.isoformat() if hasattr(d, "isoformat") else str(d)
-        if key not in checkins_by_date:
-            checkins_by_date[key] = set()
-        checkins_by_date[key].add(str(c["habit_id"]))
-    result = {}
-    d = start_date
-    while d <= end_date:
-        key = d.isoformat() if hasattr(d, "isoformat") else str(d)
-        scheduled_habit_ids = []
-        for h in habits:
-            if is_scheduled_on(h.get("schedule"), d):
-                scheduled_habit_ids.append(str(h["_id"]))
-        if not scheduled_habit_ids:
-            result[key] = False
-        else:
-            completed_ids = checkins_by_date.get(key) or set()
-            result[key] = all(hid in completed_ids for hid in scheduled_habit_ids)
-        d = d + timedelta(days=1)
-    return result
+    habits = await db.habits.find(
+        {"user_id": user_id, "archived": {"$ne": True}, **NOT_DELETED},
+        {"schedule": 1},
+    ).to_list(length=500)
+    stats = await get_daily_stats(user_id, start_date, end_date)
+    matrix = build_completion_matrix(habits, completed_checkins(stats), start_date, end_date)
+    keys = [d.isoformat() for d in matrix.days]
+    all_done = matrix.all_done.tolist()
+    if not include_ratio:
+        return dict(zip(keys, all_done))
+    ratio = matrix.ratio.tolist()
+    scheduled = matrix.scheduled_count.tolist()
+    return {
+        key: DayCompletion(completed=all_done[i], ratio=round(ratio[i], 4), scheduled=scheduled[i])
+        for i, key in enumerate(keys)
+    }
+
+
+def _encode_cursor(checkin: Dict[str, Any]) -> str:
+    raw = json.dumps({"d": checkin["date"].isoformat(), "i": str(checkin["_id"])})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
 
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        last_date = datetime.fromisoformat(raw["d"])
+        last_id = ObjectId(raw["i"])
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return {
+        "$or": [
+            {"date": {"$lt": last_date}},
+            {"date": last_date, "_id": {"$lt": last_id}},
+        ]
+    }
 
-@router.get("/", response_model=List[CheckinResponse])
+
+async def _habit_filter(user_id: ObjectId, habit_id: Optional[ObjectId]) -> Dict[str, Any]:
+    habit_filter: Dict[str, Any] = {}
+    if habit_id is not None:
+        habit_filter["$eq"] = habit_id
+    hidden = await deleted_habit_ids(user_id)
+    if hidden:
+        habit_filter["$nin"] = hidden
+    return habit_filter
+
+
+async def _stream_checkins(cursor) -> AsyncIterator[bytes]:
+    async for c in cursor:
+        yield orjson.dumps(checkin_to_json(c)) + b"\n"
+
+
+@router.get("/", response_model=List[CheckinResponse], response_class=ORJSONResponse)
 async def get_checkins(
     habit_id: Optional[str] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=CHECKINS_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
 ):
     db = get_database()
     query = {"user_id": ObjectId(current_user.id)}
-    if habit_id:
-        query["habit_id"] = ObjectId(habit_id)
+    habit_filter = await _habit_filter(ObjectId(current_user.id), ObjectId(habit_id) if habit_id else None)
+    if habit_filter:
+        query["habit_id"] = habit_filter
     if start_date:
         start_datetime = datetime.combine(start_date, datetime.min.time())
         query["date"] = {"$gte": start_datetime}
@@ -146,48 +336,43 @@ async def get_checkins(
             query["date"]["$lte"] = end_datetime
         else:
             query["date"] = {"$lte": end_datetime}
-    
-    checkins = await db.checkins.find(query).sort("date", -1).to_list(length=1000)
-    return [
-        CheckinResponse(
-            id=str(c["_id"]),
-            user_id=str(c["user_id"]),
-            habit_id=str(c["habit_id"]),
-            date=datetime_to_date(c["date"]),
-            completed=c["completed"],
-            value=c.get("value"),
-            skipped=c.get("skipped", False),
-            created_at=c.get("created_at", datetime.utcnow()),
+    if cursor:
+        query = {"$and": [query, _decode_cursor(cursor)]}
+
+    find = db.checkins.find(query, CHECKIN_PROJECTION).sort([("date", -1), ("_id", -1)])
+
+    if negotiate_media_type(accept) == NDJSON_MEDIA_TYPE:
+        if limit:
+            find = find.limit(limit)
+        return StreamingResponse(
+            _stream_checkins(find.batch_size(CHECKINS_STREAM_BATCH_SIZE)),
+            media_type=NDJSON_MEDIA_TYPE,
         )
-        for c in checkins
-    ]
+
+    page_size = limit or CHECKINS_PAGE_SIZE
+    checkins = await find.limit(page_size).to_list(length=page_size)
+    headers = {"X-Next-Cursor": _encode_cursor(checkins[-1])} if len(checkins) == page_size else None
+    return ORJSONResponse([checkin_to_json(c) for c in checkins], headers=headers)
 
 
-@router.get("/today", response_model=List[CheckinResponse])
+@router.get("/today", response_model=List[CheckinResponse], response_class=ORJSONResponse)
 async def get_today_checkins(
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
 ):
     db = get_database()
     today_date = date.today()
     today_start = datetime.combine(today_date, datetime.min.time())
     today_end = datetime.combine(today_date, datetime.max.time())
-    checkins = await db.checkins.find({
+    query = {
         "user_id": ObjectId(current_user.id),
         "date": {"$gte": today_start, "$lte": today_end},
-    }).to_list(length=100)
-    return [
-        CheckinResponse(
-            id=str(c["_id"]),
-            user_id=str(c["user_id"]),
-            habit_id=str(c["habit_id"]),
-            date=datetime_to_date(c["date"]),
-            completed=c["completed"],
-            value=c.get("value"),
-            skipped=c.get("skipped", False),
-            created_at=c.get("created_at", datetime.utcnow()),
-        )
-        for c in checkins
-    ]
+    }
+    habit_filter = await _habit_filter(ObjectId(current_user.id), None)
+    if habit_filter:
+        query["habit_id"] = habit_filter
+    checkins = await db.checkins.find(query, CHECKIN_PROJECTION).to_list(length=100)
+    return ORJSONResponse([checkin_to_json(c) for c in checkins])
 
 
 @router.delete("/{checkin_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -201,10 +386,14 @@ async def delete_checkin(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checkin not found")
     
     habit = await db.habits.find_one({"_id": checkin["habit_id"]})
+    if habit and habit.get("deleted_at") is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checkin not found")
     habit_frequency = habit.get("frequency", "daily") if habit else "daily"
     await db.checkins.delete_one({"_id": ObjectId(checkin_id)})
     checkin_date_obj = datetime_to_date(checkin["date"])
     if isinstance(checkin_date_obj, date):
+        await record_checkin_change(ObjectId(current_user.id), checkin["habit_id"], checkin_date_obj, checkin, None)
+        await record_checkin_bitmap(ObjectId(current_user.id), checkin["habit_id"], checkin_date_obj, None)
         await update_streak(
             ObjectId(current_user.id),
             checkin["habit_id"],
@@ -212,3 +401,4 @@ async def delete_checkin(
             False,
             habit_frequency,
         )
+    await bump_data_version(ObjectId(current_user.id))
@@ -1,51 +1,38 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 from bson import ObjectId
 from app.core.database import get_database
-from app.core.dependencies import get_current_user
+from app.core.dependencies import conditional_get, get_current_user
+from app.core.serialization import HABIT_PROJECTION, habit_to_json
 from app.models.user import User
-from app.models.habit import Habit, HabitCreate, HabitUpdate, HabitResponse
-from app.services.streak_service import get_streak
+from app.models.habit import Habit, HabitCreate, HabitOrderUpdate, HabitUpdate, HabitResponse
+from app.services.streak_service import get_streak, get_streaks
 from app.services.schedule_service import normalize_schedule
+from app.services.order_service import apply_order, move_habit, next_order
+from app.services.purge_service import NOT_DELETED, tombstone_habit
+from app.services.version_service import bump_data_version
 from datetime import datetime, date
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[HabitResponse])
+@router.get("/", response_model=List[HabitResponse], response_class=ORJSONResponse)
 async def get_habits(
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
     archived: bool = False,
     as_of_date: Optional[date] = None,
 ):
     db = get_database()
-    query = {"user_id": ObjectId(current_user.id), "archived": archived}
-    habits = await db.habits.find(query).sort("order", 1).to_list(length=100)
-    result = []
-    for h in habits:
-        habit_frequency = h.get("frequency", "daily")
-        streak_data = await get_streak(ObjectId(current_user.id), h["_id"], habit_frequency, as_of_date)
-        result.append(
-            HabitResponse(
-                id=str(h["_id"]),
-                user_id=str(h["user_id"]),
-                name=h["name"],
-                type=h["type"],
-                frequency=h["frequency"],
-                schedule=h.get("schedule"),
-                time_of_day=h.get("time_of_day"),
-                start_date=h["start_date"],
-                goal=h.get("goal"),
-                color=h.get("color", "#3B82F6"),
-                icon=h.get("icon"),
-                category=h.get("category"),
-                order=h.get("order", 0),
-                archived=h.get("archived", False),
-                created_at=h.get("created_at", datetime.utcnow()),
-                current_streak=streak_data["current_streak"],
-            )
-        )
-    return result
+    query = {"user_id": ObjectId(current_user.id), "archived": archived, **NOT_DELETED}
+    habits = await db.habits.find(query, HABIT_PROJECTION).sort("order", 1).to_list(length=100)
+    streaks = await get_streaks(
+        ObjectId(current_user.id),
+        [(h["_id"], h.get("frequency", "daily")) for h in habits],
+        as_of_date,
+    )
+    return ORJSONResponse([habit_to_json(h, streaks[h["_id"]]["current_streak"]) for h in habits])
 
 
 @router.post("/", response_model=HabitResponse, status_code=status.HTTP_201_CREATED)
@@ -54,7 +41,6 @@ async def create_habit(
     current_user: User = Depends(get_current_user),
 ):
     db = get_database()
-    count = await db.habits.count_documents({"user_id": ObjectId(current_user.id), "archived": False})
     schedule = normalize_schedule(habit_data.schedule, date.today())
     habit_dict = {
         "_id": ObjectId(),
@@ -69,11 +55,12 @@ async def create_habit(
         "color": habit_data.color or "#3B82F6",
         "icon": habit_data.icon,
         "category": habit_data.category,
-        "order": count,
+        "order": await next_order(ObjectId(current_user.id)),
         "archived": False,
         "created_at": datetime.utcnow(),
     }
     await db.habits.insert_one(habit_dict)
+    await bump_data_version(ObjectId(current_user.id))
     habit_frequency = habit_dict.get("frequency", "daily")
     streak_data = await get_streak(ObjectId(current_user.id), habit_dict["_id"], habit_frequency)
     return HabitResponse(
@@ -96,13 +83,30 @@ async def create_habit(
     )
 
 
+@router.put("/order")
+async def reorder_habits(
+    payload: HabitOrderUpdate,
+    current_user: User = Depends(get_current_user),
+):
+    if not all(ObjectId.is_valid(habit_id) for habit_id in payload.habit_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid habit id")
+    habit_ids = [ObjectId(habit_id) for habit_id in payload.habit_ids]
+    if len(set(habit_ids)) != len(habit_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate habit id")
+    if not await apply_order(ObjectId(current_user.id), habit_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order must list every habit of one scope")
+    await bump_data_version(ObjectId(current_user.id))
+    return {"message": "Order updated"}
+
+
 @router.get("/{habit_id}", response_model=HabitResponse)
 async def get_habit(
     habit_id: str,
     current_user: User = Depends(get_current_user),
+    etag: str = Depends(conditional_get),
 ):
     db = get_database()
-    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)})
+    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED})
     if not habit:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
     habit_frequency = habit.get("frequency", "daily")
@@ -134,7 +138,7 @@ async def update_habit(
     current_user: User = Depends(get_current_user),
 ):
     db = get_database()
-    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)})
+    habit = await db.habits.find_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED})
     if not habit:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
     update_data = habit_data.model_dump(exclude_unset=True)
@@ -144,6 +148,7 @@ async def update_habit(
         {"_id": ObjectId(habit_id)},
         {"$set": update_data},
     )
+    await bump_data_version(ObjectId(current_user.id))
     updated_habit = await db.habits.find_one({"_id": ObjectId(habit_id)})
     habit_frequency = updated_habit.get("frequency", "daily")
     streak_data = await get_streak(ObjectId(current_user.id), updated_habit["_id"], habit_frequency)
@@ -172,28 +177,36 @@ async def delete_habit(
     habit_id: str,
     current_user: User = Depends(get_current_user),
 ):
-    db = get_database()
-    result = await db.habits.delete_one({"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)})
-    if result.deleted_count == 0:
+    if not await tombstone_habit(ObjectId(current_user.id), ObjectId(habit_id)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    await db.checkins.delete_many({"habit_id": ObjectId(habit_id)})
-    await db.streaks.delete_many({"habit_id": ObjectId(habit_id)})
+    await bump_data_version(ObjectId(current_user.id))
 
 
 @router.patch("/{habit_id}/order")
 async def update_habit_order(
     habit_id: str,
-    order: int,
+    order: Optional[float] = None,
+    after_id: Optional[str] = None,
     current_user: User = Depends(get_current_user),
 ):
-    db = get_database()
-    result = await db.habits.update_one(
-        {"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)},
-        {"$set": {"order": order}},
-    )
-    if result.matched_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    return {"message": "Order updated"}
+    if order is None and after_id is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Either order or after_id is required")
+    if after_id == habit_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Habit cannot be placed after itself")
+    if order is None:
+        order = await move_habit(ObjectId(current_user.id), ObjectId(habit_id), ObjectId(after_id))
+        if order is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
+    else:
+        db = get_database()
+        result = await db.habits.update_one(
+            {"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED},
+            {"$set": {"order": order}},
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
+    await bump_data_version(ObjectId(current_user.id))
+    return {"message": "Order updated", "order": order}
 
 
 @router.post("/{habit_id}/archive")
@@ -203,9 +216,10 @@ async def archive_habit(
 ):
     db = get_database()
     result = await db.habits.update_one(
-        {"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id)},
+        {"_id": ObjectId(habit_id), "user_id": ObjectId(current_user.id), **NOT_DELETED},
         {"$set": {"archived": True}},
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
+    await bump_data_version(ObjectId(current_user.id))
     return {"message": "Habit archived"}
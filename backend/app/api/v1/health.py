@@ -0,0 +1,29 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from app.core import database
+from app.core.config import settings
+from app.core.scheduler import scheduler
+
+router = APIRouter()
+
+
+@router.get("/db")
+async def get_db_health():
+    body = {
+        "status": "ok",
+        "ping_ms": None,
+        "pool": database.pool_metrics.snapshot(),
+        "analytics_read_preference": settings.MONGODB_ANALYTICS_READ_PREFERENCE,
+    }
+    try:
+        body["ping_ms"] = round(await database.ping(), 2)
+    except Exception as exc:
+        body["status"] = "error"
+        body["detail"] = str(exc)
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+
+@router.get("/scheduler")
+async def get_scheduler_health():
+    return scheduler.snapshot()
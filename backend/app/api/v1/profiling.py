@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.core.profiling import list_profiles, profile_path, token_allowed
+
+router = APIRouter()
+
+
+def require_profiling_token(request: Request) -> None:
+    if not token_allowed(request.headers.get(settings.PROFILING_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling access denied")
+
+
+@router.get("/", dependencies=[Depends(require_profiling_token)])
+async def get_profiles():
+    return list_profiles()
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_token)])
+async def download_profile(profile_id: str):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(str(path), media_type="application/octet-stream", filename=path.name)
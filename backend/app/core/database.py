@@ -1,19 +1,135 @@
+import time
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+from typing import Any, Dict, Optional
 from app.core.config import settings
+from app.core.metrics import mongo_command_listener
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.closed = 0
+        self.checkout_failures = 0
+        self.cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open += 1
+        self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open -= 1
+        self.closed += 1
+
+    def connection_check_out_started(self, event):
+        self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        self.waiting -= 1
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.waiting -= 1
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "created": self.created,
+            "closed": self.closed,
+            "checkout_failures": self.checkout_failures,
+            "cleared": self.cleared,
+        }
+
 
 client: Optional[AsyncIOMotorClient] = None
 database = None
+analytics_database = None
+pool_metrics = PoolMetrics()
 
 
-async def connect_to_mongo():
-    global client, database
-    connect_kwargs = {}
+def _analytics_read_preference():
+    mode = READ_PREFERENCES[settings.MONGODB_ANALYTICS_READ_PREFERENCE]
+    if mode is Primary:
+        return Primary()
+    max_staleness = settings.MONGODB_ANALYTICS_MAX_STALENESS_SECONDS
+    return mode(max_staleness=max_staleness if max_staleness is not None else -1)
+
+
+def analytics_reads_primary() -> bool:
+    return settings.MONGODB_ANALYTICS_READ_PREFERENCE == "primary"
+
+
+def _client_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "event_listeners": [pool_metrics, mongo_command_listener],
+    }
+    optional = {
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+    }
+    options.update({key: value for key, value in optional.items() if value is not None})
+    if settings.MONGODB_COMPRESSORS:
+        options["compressors"] = settings.MONGODB_COMPRESSORS
     if settings.MONGODB_USE_TLS or settings.MONGODB_URL.startswith("mongodb+srv://"):
-        connect_kwargs["tlsCAFile"] = certifi.where()
-    client = AsyncIOMotorClient(settings.MONGODB_URL, **connect_kwargs)
-    database = client.get_database("habittracker")
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+
+async def connect_to_mongo():
+    global client, database, analytics_database
+    client = AsyncIOMotorClient(settings.MONGODB_URL, **_client_options())
+    database = client.get_database(settings.MONGODB_DATABASE)
+    analytics_database = client.get_database(
+        settings.MONGODB_DATABASE,
+        read_preference=_analytics_read_preference(),
+    )
 
 
 async def close_mongo_connection():
@@ -24,3 +140,13 @@ async def close_mongo_connection():
 
 def get_database():
     return database
+
+
+def get_analytics_database():
+    return analytics_database if analytics_database is not None else database
+
+
+async def ping() -> float:
+    started = time.perf_counter()
+    await database.command("ping")
+    return (time.perf_counter() - started) * 1000
@@ -1,19 +1,46 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import time
+from datetime import date
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import decode_access_token
-from app.core.database import get_database
+from app.core.database import analytics_reads_primary, get_database
 from app.models.user import User
+from app.services.version_service import get_data_version
 from typing import Optional
 from bson import ObjectId
 
 security = HTTPBearer()
 
+_user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+_token_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _decode_token(token: str) -> Optional[dict]:
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return payload
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache.set(digest, payload, exp - time.time())
+    return payload
+
+
+def invalidate_user(user_id: str) -> None:
+    _user_cache.pop(str(user_id))
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> User:
     token = credentials.credentials
-    payload = decode_access_token(token)
+    payload = _decode_token(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,6 +54,9 @@ async def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return cached
     db = get_database()
     user = await db.users.find_one({"_id": ObjectId(user_id)})
     if user is None:
@@ -37,4 +67,49 @@ async def get_current_user(
         )
     user_dict = {**user, "id": str(user["_id"])}
     user_dict.pop("_id", None)
-    return User(**user_dict)
+    current_user = User(**user_dict)
+    _user_cache.set(user_id, current_user)
+    return current_user
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    return NDJSON_MEDIA_TYPE if accept and NDJSON_MEDIA_TYPE in accept else "application/json"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+async def conditional_get(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+) -> str:
+    version = await get_data_version(ObjectId(current_user.id))
+    key = "|".join([
+        current_user.id,
+        str(version),
+        date.today().isoformat(),
+        request.url.path,
+        negotiate_media_type(request.headers.get("accept")),
+        "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+    ])
+    etag = f'W/"{version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept"})
+    request.state.etag = etag
+    return etag
+
+
+async def analytics_conditional_get(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+) -> Optional[str]:
+    if not analytics_reads_primary():
+        return None
+    return await conditional_get(request, current_user)
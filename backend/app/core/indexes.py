@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "habits": [
+        IndexModel(
+            [("user_id", ASCENDING), ("archived", ASCENDING), ("order", ASCENDING)],
+            name="user_archived_order",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("deleted_at", ASCENDING)],
+            name="user_deleted_pending",
+            partialFilterExpression={"deleted_at": {"$type": "date"}},
+        ),
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="deleted_pending",
+            partialFilterExpression={"deleted_at": {"$type": "date"}},
+        ),
+    ],
+    "checkins": [
+        IndexModel(
+            [("user_id", ASCENDING), ("habit_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+            name="user_habit_date_id",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+            name="user_date_id",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("habit_id", ASCENDING), ("day", ASCENDING)],
+            name="user_habit_day_unique",
+            unique=True,
+            partialFilterExpression={"day": {"$type": "string"}},
+        ),
+    ],
+    "daily_stats": [
+        IndexModel(
+            [("user_id", ASCENDING), ("day", ASCENDING)],
+            name="user_day_unique",
+            unique=True,
+        ),
+    ],
+    "completion_bitmaps": [
+        IndexModel(
+            [("user_id", ASCENDING), ("habit_id", ASCENDING), ("year", ASCENDING)],
+            name="user_habit_year_unique",
+            unique=True,
+        ),
+    ],
+    "streaks": [
+        IndexModel(
+            [("user_id", ASCENDING), ("habit_id", ASCENDING)],
+            name="user_habit_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("frequency", ASCENDING), ("last_checkin_date", ASCENDING)],
+            name="active_rollover",
+            partialFilterExpression={"active_streak": {"$gt": 0}},
+        ),
+    ],
+}
+
+BACKFILL_BATCH_SIZE = 1000
+
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+_SAMPLE_USER = ObjectId()
+_SAMPLE_HABIT = ObjectId()
+_SAMPLE_RANGE = {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 12, 31, 23, 59, 59)}
+
+_SAMPLE_HIDDEN = {"$nin": [ObjectId()]}
+_SAMPLE_DAYS = {"$gte": "2024-01-01", "$lte": "2024-12-31"}
+_CHECKIN_ORDER = [("date", DESCENDING), ("_id", DESCENDING)]
+_ACTIVE = {"user_id": _SAMPLE_USER, "archived": False, "deleted_at": None}
+
+QUERY_SHAPES: List[Tuple[str, str, Dict[str, Any], List[Tuple[str, int]]]] = [
+    ("auth.login", "users", {"email": "user@example.com"}, []),
+    ("users.scan", "users", {"_id": {"$gt": _SAMPLE_USER}}, [("_id", ASCENDING)]),
+    ("habits.list", "habits", _ACTIVE, [("order", ASCENDING)]),
+    ("habits.by_id", "habits", {"_id": _SAMPLE_HABIT, "user_id": _SAMPLE_USER, "deleted_at": None}, []),
+    (
+        "habits.by_ids",
+        "habits",
+        {"_id": {"$in": [_SAMPLE_HABIT]}, "user_id": _SAMPLE_USER, "deleted_at": None},
+        [],
+    ),
+    ("habits.order_last", "habits", _ACTIVE, [("order", DESCENDING)]),
+    (
+        "habits.order_following",
+        "habits",
+        {**_ACTIVE, "_id": {"$nin": [_SAMPLE_HABIT]}, "order": {"$gte": 1024.0}},
+        [("order", ASCENDING)],
+    ),
+    ("habits.rebalance", "habits", _ACTIVE, [("order", ASCENDING), ("_id", ASCENDING)]),
+    (
+        "checkins.day_completion.habits",
+        "habits",
+        {"user_id": _SAMPLE_USER, "archived": {"$ne": True}, "deleted_at": None},
+        [],
+    ),
+    ("habits.repair", "habits", {"user_id": _SAMPLE_USER, "deleted_at": None}, []),
+    ("habits.deleted", "habits", {"user_id": _SAMPLE_USER, "deleted_at": {"$type": "date"}}, []),
+    ("habits.purge_pending", "habits", {"deleted_at": {"$type": "date", "$lte": datetime(2024, 1, 1)}}, []),
+    (
+        "checkins.bulk_existing",
+        "checkins",
+        {"user_id": _SAMPLE_USER, "habit_id": {"$in": [_SAMPLE_HABIT]}, "date": _SAMPLE_RANGE},
+        [],
+    ),
+    ("checkins.upsert", "checkins", {"user_id": _SAMPLE_USER, "habit_id": _SAMPLE_HABIT, "day": "2024-01-01"}, []),
+    ("checkins.list", "checkins", {"user_id": _SAMPLE_USER}, _CHECKIN_ORDER),
+    ("checkins.list_visible", "checkins", {"user_id": _SAMPLE_USER, "habit_id": _SAMPLE_HIDDEN}, _CHECKIN_ORDER),
+    (
+        "checkins.list_by_habit",
+        "checkins",
+        {"user_id": _SAMPLE_USER, "habit_id": {"$eq": _SAMPLE_HABIT, **_SAMPLE_HIDDEN}},
+        _CHECKIN_ORDER,
+    ),
+    (
+        "checkins.list_page",
+        "checkins",
+        {
+            "$and": [
+                {"user_id": _SAMPLE_USER, "habit_id": _SAMPLE_HIDDEN, "date": _SAMPLE_RANGE},
+                {
+                    "$or": [
+                        {"date": {"$lt": datetime(2024, 6, 1)}},
+                        {"date": datetime(2024, 6, 1), "_id": {"$lt": _SAMPLE_HABIT}},
+                    ]
+                },
+            ]
+        },
+        _CHECKIN_ORDER,
+    ),
+    ("checkins.today", "checkins", {"user_id": _SAMPLE_USER, "date": _SAMPLE_RANGE, "habit_id": _SAMPLE_HIDDEN}, []),
+    ("checkins.by_id", "checkins", {"_id": _SAMPLE_HABIT, "user_id": _SAMPLE_USER}, []),
+    (
+        "analytics.habit_checkins",
+        "checkins",
+        {"user_id": _SAMPLE_USER, "habit_id": _SAMPLE_HABIT, "date": _SAMPLE_RANGE},
+        [],
+    ),
+    (
+        "analytics.recent_checkins",
+        "checkins",
+        {"user_id": _SAMPLE_USER, "habit_id": {"$in": [_SAMPLE_HABIT]}},
+        [("user_id", ASCENDING), ("habit_id", ASCENDING), ("date", DESCENDING)],
+    ),
+    ("checkins.habit_history", "checkins", {"user_id": _SAMPLE_USER, "habit_id": _SAMPLE_HABIT}, [("date", ASCENDING)]),
+    (
+        "checkins.rollup_refresh",
+        "checkins",
+        {"user_id": _SAMPLE_USER, "habit_id": {"$nin": [_SAMPLE_HABIT]}, "date": _SAMPLE_RANGE},
+        [],
+    ),
+    ("daily_stats.range", "daily_stats", {"user_id": _SAMPLE_USER, "day": _SAMPLE_DAYS}, [("day", ASCENDING)]),
+    (
+        "analytics.heatmap",
+        "daily_stats",
+        {"user_id": _SAMPLE_USER, "day": _SAMPLE_DAYS, "completed": {"$gt": 0}},
+        [],
+    ),
+    (
+        "completion_bitmaps.history",
+        "completion_bitmaps",
+        {"user_id": _SAMPLE_USER, "habit_id": {"$in": [_SAMPLE_HABIT]}, "year": {"$lte": 2024}},
+        [("year", ASCENDING)],
+    ),
+    ("completion_bitmaps.refresh", "completion_bitmaps", {"user_id": _SAMPLE_USER}, []),
+    ("streaks.stored", "streaks", {"user_id": _SAMPLE_USER, "habit_id": {"$in": [_SAMPLE_HABIT]}}, []),
+    (
+        "streaks.rollover",
+        "streaks",
+        {"frequency": "daily", "active_streak": {"$gt": 0}, "last_checkin_date": {"$lt": datetime(2024, 1, 1)}},
+        [],
+    ),
+    (
+        "streaks.rollover_user",
+        "streaks",
+        {
+            "user_id": _SAMPLE_USER,
+            "frequency": "daily",
+            "active_streak": {"$gt": 0},
+            "last_checkin_date": {"$lt": datetime(2024, 1, 1)},
+        },
+        [],
+    ),
+]
+
+
+def _normalize_key(key: Any) -> List[Tuple[str, Any]]:
+    items = key.items() if isinstance(key, dict) else key
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in items]
+
+
+def _expected_spec(model: IndexModel) -> Dict[str, Any]:
+    document = model.document
+    spec = {"key": _normalize_key(document["key"])}
+    for option in COMPARED_OPTIONS:
+        if option in document:
+            spec[option] = document[option]
+    return spec
+
+
+def _live_spec(info: Dict[str, Any]) -> Dict[str, Any]:
+    spec = {"key": _normalize_key(info["key"])}
+    for option in COMPARED_OPTIONS:
+        if option in info:
+            spec[option] = info[option]
+    return spec
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    created: Dict[str, List[str]] = {}
+    for collection, models in INDEXES.items():
+        created[collection] = []
+        for model in models:
+            try:
+                created[collection].extend(await db[collection].create_indexes([model]))
+            except OperationFailure as exc:
+                logger.warning("Could not create index %s.%s: %s", collection, model.document["name"], exc)
+    return created
+
+
+async def index_drift(db) -> Dict[str, Dict[str, List[str]]]:
+    drift: Dict[str, Dict[str, List[str]]] = {}
+    for collection, models in INDEXES.items():
+        live = await db[collection].index_information()
+        live.pop("_id_", None)
+        expected = {model.document["name"]: _expected_spec(model) for model in models}
+        report = {
+            "missing": sorted(name for name in expected if name not in live),
+            "changed": sorted(
+                name for name, spec in expected.items()
+                if name in live and _live_spec(live[name]) != spec
+            ),
+            "unexpected": sorted(name for name in live if name not in expected),
+        }
+        if any(report.values()):
+            drift[collection] = report
+    return drift
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+async def find_collection_scans(db) -> List[str]:
+    offenders: List[str] = []
+    for label, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            offenders.append(f"{label} ({collection})")
+    return offenders
+
+
+_LEGACY_CHECKIN = {"day": {"$exists": False}, "date": {"$type": "date"}}
+_CHECKIN_STATE_FIELDS = ("date", "completed", "skipped", "value")
+
+
+def _checkin_rank(checkin: Dict[str, Any]) -> Tuple[bool, datetime]:
+    written = checkin.get("created_at") or checkin["_id"].generation_time.replace(tzinfo=None)
+    return bool(checkin.get("completed")), written
+
+
+async def _merge_legacy_checkin(db, legacy: Dict[str, Any]) -> bool:
+    kept = await db.checkins.find_one({
+        "user_id": legacy["user_id"],
+        "habit_id": legacy["habit_id"],
+        "day": legacy["date"].strftime("%Y-%m-%d"),
+    })
+    if kept is None:
+        return False
+    if _checkin_rank(legacy) > _checkin_rank(kept):
+        await db.checkins.update_one(
+            {"_id": kept["_id"]},
+            {"$set": {field: legacy.get(field) for field in _CHECKIN_STATE_FIELDS}},
+        )
+    await db.checkin_duplicates.replace_one(
+        {"_id": legacy["_id"]},
+        {**legacy, "merged_into": kept["_id"], "merged_at": datetime.utcnow()},
+        upsert=True,
+    )
+    await db.checkins.delete_one({"_id": legacy["_id"], **_LEGACY_CHECKIN})
+    return True
+
+
+async def backfill_checkin_days(db, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, Any]:
+    updated = 0
+    merged = 0
+    users: Set[ObjectId] = set()
+    while True:
+        cursor = db.checkins.find(_LEGACY_CHECKIN).sort("_id", DESCENDING).limit(batch_size)
+        batch = await cursor.to_list(length=batch_size)
+        if not batch:
+            return {"updated": updated, "merged": merged, "users": sorted(users)}
+        writes = [
+            UpdateOne({"_id": c["_id"], **_LEGACY_CHECKIN}, {"$set": {"day": c["date"].strftime("%Y-%m-%d")}})
+            for c in batch
+        ]
+        try:
+            result = await db.checkins.bulk_write(writes, ordered=False)
+            updated += result.modified_count
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            updated += exc.details.get("nModified", 0)
+            for error in errors:
+                legacy = batch[error["index"]]
+                if await _merge_legacy_checkin(db, legacy):
+                    merged += 1
+                    users.add(legacy["user_id"])
+
+
+async def _run(command: str) -> int:
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if command == "apply":
+            for collection, names in (await ensure_indexes(db)).items():
+                print(f"{collection}: {', '.join(names) or '-'}")
+            return 0
+        if command == "backfill-day":
+            result = await backfill_checkin_days(db)
+            print(f"checkins: {result['updated']} updated, {result['merged']} duplicates merged")
+            if result["users"]:
+                print(f"run `maintenance_service repair --user <id>` for: {', '.join(map(str, result['users']))}")
+            return 0
+        if command == "check":
+            drift = await index_drift(db)
+            for collection, report in drift.items():
+                for kind, names in report.items():
+                    if names:
+                        print(f"{collection} {kind}: {', '.join(names)}")
+            return 1 if drift else 0
+        offenders = await find_collection_scans(db)
+        for offender in offenders:
+            print(f"COLLSCAN: {offender}")
+        return 1 if offenders else 0
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.core.indexes")
+    parser.add_argument("command", choices=["apply", "check", "explain", "backfill-day"])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
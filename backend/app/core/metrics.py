@@ -0,0 +1,220 @@
+import math
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+JOB_DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def totals(self, labels: Tuple[str, ...]) -> Tuple[int, float]:
+        with self._lock:
+            counts, total = self._values.get(labels, ([0], [0.0]))
+            return sum(counts), total[0]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = self.header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class RequestMongoStats:
+    def __init__(self):
+        self.commands = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.commands += 1
+            self.seconds += seconds
+
+
+current_request_mongo: ContextVar[Optional[RequestMongoStats]] = ContextVar("current_request_mongo", default=None)
+
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", LATENCY_BUCKETS, ("method", "route")
+)
+http_request_mongo_commands = Histogram(
+    "http_request_mongo_commands", "MongoDB commands issued per HTTP request.", COMMAND_COUNT_BUCKETS, ("method", "route")
+)
+http_request_mongo_seconds = Histogram(
+    "http_request_mongo_seconds", "Time spent in MongoDB commands per HTTP request.", LATENCY_BUCKETS, ("method", "route")
+)
+mongo_command_duration_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency.", MONGO_LATENCY_BUCKETS, ("command", "outcome")
+)
+scheduler_leader = Gauge("scheduler_leader", "1 if this process holds the scheduler leader lock.")
+scheduler_job_runs_total = Counter(
+    "scheduler_job_runs_total", "Scheduled job runs by outcome.", ("job", "outcome")
+)
+scheduler_job_duration_seconds = Histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time.", JOB_DURATION_BUCKETS, ("job",)
+)
+scheduler_job_last_success_seconds = Gauge(
+    "scheduler_job_last_success_seconds", "Unix time of the last successful job run.", ("job",)
+)
+
+REGISTRY = [
+    http_requests_in_flight,
+    http_requests_total,
+    http_request_duration_seconds,
+    http_request_mongo_commands,
+    http_request_mongo_seconds,
+    mongo_command_duration_seconds,
+    scheduler_leader,
+    scheduler_job_runs_total,
+    scheduler_job_duration_seconds,
+    scheduler_job_last_success_seconds,
+]
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def _record(self, event, outcome: str) -> None:
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration_seconds.observe((event.command_name, outcome), seconds)
+        stats = current_request_mongo.get()
+        if stats is not None:
+            stats.record(seconds)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def _snapshot_lines(prefix: str, snapshot: Dict[str, Any]) -> Iterable[str]:
+    for key, value in snapshot.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"{prefix}_{key}"
+        yield f"# TYPE {name} gauge"
+        yield f"{name} {_number(value)}"
+
+
+def render_metrics(snapshots: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for prefix, snapshot in (snapshots or {}).items():
+        lines.extend(_snapshot_lines(prefix, snapshot))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,70 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import (
+    RequestMongoStats,
+    current_request_mongo,
+    http_request_duration_seconds,
+    http_request_mongo_commands,
+    http_request_mongo_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+)
+
+
+class ETagMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"etag", etag.encode("latin-1")),
+                        (b"cache-control", b"private, no-cache"),
+                        (b"vary", b"Accept"),
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestMongoStats()
+        token = current_request_mongo.set(stats)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_request_mongo.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            http_requests_total.inc((*labels, str(status_code)))
+            http_request_duration_seconds.observe(labels, elapsed)
+            http_request_mongo_commands.observe(labels, stats.commands)
+            http_request_mongo_seconds.observe(labels, stats.seconds)
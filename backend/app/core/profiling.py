@@ -0,0 +1,152 @@
+import asyncio
+import cProfile
+import hmac
+import json
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import RequestMongoStats, current_request_mongo
+from app.core.security import decode_access_token
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def token_allowed(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN and token and hmac.compare_digest(token, settings.PROFILING_TOKEN))
+
+
+def _user_id(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                payload = decode_access_token(token)
+                return payload.get("sub") if payload else None
+    return None
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _store(profiler: cProfile.Profile, profile_id: str, meta: Dict[str, Any]) -> None:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(directory / f"{profile_id}.prof"))
+    (directory / f"{profile_id}.json").write_text(json.dumps(meta, indent=2))
+    stored = sorted(directory.glob("*.prof"))
+    for old in stored[:max(len(stored) - settings.PROFILING_MAX_FILES, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".json").unlink(missing_ok=True)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for meta_path in sorted(directory.glob("*.json"), reverse=True):
+        try:
+            profiles.append(json.loads(meta_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.header = settings.PROFILING_HEADER.lower().encode("latin-1")
+        self._active = False
+        self._in_flight = 0
+        self._overlapping = 0
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if token_allowed(_header(scope, self.header)):
+            return "header"
+        if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def _passthrough(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._in_flight += 1
+        if self._active:
+            self._overlapping += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = None if self._active else self._trigger(scope)
+        if trigger is None:
+            await self._passthrough(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+        stats = current_request_mongo.get()
+        token = None
+        if stats is None:
+            stats = RequestMongoStats()
+            token = current_request_mongo.set(stats)
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode("latin-1"))]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        self._active = True
+        self._overlapping = self._in_flight
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            self._active = False
+            if token is not None:
+                current_request_mongo.reset(token)
+            route = scope.get("route")
+            meta = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "user_id": _user_id(scope),
+                "status": status_code,
+                "duration_ms": round(elapsed * 1000, 3),
+                "mongo_commands": stats.commands,
+                "mongo_ms": round(stats.seconds * 1000, 3),
+                "concurrent_requests": self._overlapping,
+                "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            }
+            await asyncio.to_thread(_store, profiler, profile_id, meta)
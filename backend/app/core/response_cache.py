@@ -0,0 +1,180 @@
+import abc
+import hashlib
+import importlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+import orjson
+from fastapi.responses import Response
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheBackend(abc.ABC):
+    @abc.abstractmethod
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def invalidate(self, namespace: str) -> None:
+        ...
+
+
+class NullResponseCacheBackend(ResponseCacheBackend):
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        return None
+
+    async def invalidate(self, namespace: str) -> None:
+        return None
+
+
+class MemoryResponseCacheBackend(ResponseCacheBackend):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, bytes]]" = OrderedDict()
+        self._keys: Dict[str, Set[str]] = {}
+
+    def _discard(self, namespace: str, key: str) -> None:
+        self._data.pop((namespace, key), None)
+        keys = self._keys.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[namespace]
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        entry = self._data.get((namespace, key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(namespace, key)
+            return None
+        self._data.move_to_end((namespace, key))
+        return value
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._data[(namespace, key)] = (time.monotonic() + ttl, value)
+        self._data.move_to_end((namespace, key))
+        self._keys.setdefault(namespace, set()).add(key)
+        while len(self._data) > self.maxsize:
+            evicted_namespace, evicted_key = next(iter(self._data))
+            self._discard(evicted_namespace, evicted_key)
+
+    async def invalidate(self, namespace: str) -> None:
+        for key in self._keys.pop(namespace, ()):
+            self._data.pop((namespace, key), None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResponseCacheMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+def _json_response(body: bytes, hit: bool) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Cache": "HIT" if hit else "MISS"},
+    )
+
+
+class ResponseCache:
+    def __init__(self, backend: ResponseCacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.metrics = ResponseCacheMetrics()
+
+    def key(self, endpoint: str, params: Dict[str, Any], version: int, cacheable: bool = True) -> Optional[str]:
+        if not cacheable:
+            return None
+        encoded = orjson.dumps(params, option=orjson.OPT_SORT_KEYS, default=str)
+        digest = hashlib.sha1(encoded).hexdigest()[:20]
+        return f"{endpoint}:{version}:{date.today().isoformat()}:{digest}"
+
+    async def lookup(self, user_id: Any, key: Optional[str]) -> Optional[Response]:
+        if key is None:
+            return None
+        try:
+            body = await self.backend.get(str(user_id), key)
+        except Exception:
+            self.metrics.errors += 1
+            logger.warning("Response cache lookup failed", exc_info=True)
+            body = None
+        if body is None:
+            self.metrics.misses += 1
+            return None
+        self.metrics.hits += 1
+        return _json_response(body, hit=True)
+
+    async def store(self, user_id: Any, key: Optional[str], payload: Any) -> Response:
+        body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        if key is None:
+            return _json_response(body, hit=False)
+        try:
+            await self.backend.set(str(user_id), key, body, min(self.ttl, _seconds_until_midnight()))
+            self.metrics.stores += 1
+        except Exception:
+            self.metrics.errors += 1
+            logger.warning("Response cache store failed", exc_info=True)
+        return _json_response(body, hit=False)
+
+    async def invalidate(self, user_id: Any) -> None:
+        try:
+            await self.backend.invalidate(str(user_id))
+            self.metrics.invalidations += 1
+        except Exception:
+            self.metrics.errors += 1
+            logger.warning("Response cache invalidation failed", exc_info=True)
+
+
+def _load_backend(name: str) -> ResponseCacheBackend:
+    if name == "memory":
+        return MemoryResponseCacheBackend(settings.RESPONSE_CACHE_SIZE)
+    if name in ("", "none"):
+        return NullResponseCacheBackend()
+    module_name, _, attr = name.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+
+response_cache = ResponseCache(
+    _load_backend(settings.RESPONSE_CACHE_BACKEND),
+    settings.RESPONSE_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,137 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import (
+    scheduler_job_duration_seconds,
+    scheduler_job_last_success_seconds,
+    scheduler_job_runs_total,
+    scheduler_leader,
+)
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "scheduler"
+
+
+class LeaderLock:
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = False
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        db = get_database()
+        try:
+            await db.scheduler_locks.update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.ttl, "renewed_at": now}},
+                upsert=True,
+            )
+            held = True
+        except DuplicateKeyError:
+            held = False
+        if held != self.held:
+            logger.info("Scheduler leadership %s by %s", "acquired" if held else "lost", self.owner)
+        self.held = held
+        scheduler_leader.set((), 1 if held else 0)
+        return held
+
+    async def release(self) -> None:
+        if self.held:
+            db = get_database()
+            await db.scheduler_locks.delete_one({"_id": self.name, "owner": self.owner})
+        self.held = False
+        scheduler_leader.set((), 0)
+
+
+class JobScheduler:
+    def __init__(self):
+        self.lock = LeaderLock(LOCK_NAME, settings.SCHEDULER_LOCK_TTL_SECONDS)
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._jobs: Dict[str, tuple] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]], trigger: BaseTrigger) -> None:
+        self._jobs[name] = (func, trigger)
+
+    async def _heartbeat(self) -> None:
+        try:
+            await self.lock.acquire()
+        except Exception:
+            logger.exception("Scheduler lock renewal failed")
+            self.lock.held = False
+            scheduler_leader.set((), 0)
+
+    async def run_job(self, name: str) -> None:
+        func, _ = self._jobs[name]
+        if not self.lock.held:
+            scheduler_job_runs_total.inc((name, "skipped"))
+            return
+        started = time.perf_counter()
+        try:
+            result = await func()
+        except Exception:
+            scheduler_job_runs_total.inc((name, "failure"))
+            logger.exception("Scheduled job %s failed", name)
+        else:
+            scheduler_job_runs_total.inc((name, "success"))
+            scheduler_job_last_success_seconds.set((name,), time.time())
+            logger.info("Scheduled job %s finished: %s", name, result)
+        finally:
+            scheduler_job_duration_seconds.observe((name,), time.perf_counter() - started)
+
+    async def start(self) -> None:
+        if self._scheduler is not None:
+            return
+        await self._heartbeat()
+        scheduler = AsyncIOScheduler(job_defaults={
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+        })
+        scheduler.add_job(
+            self._heartbeat,
+            IntervalTrigger(seconds=settings.SCHEDULER_LOCK_RENEW_SECONDS),
+            id="scheduler_heartbeat",
+        )
+        for name, (_, trigger) in self._jobs.items():
+            scheduler.add_job(self.run_job, trigger, args=[name], id=name)
+        scheduler.start()
+        self._scheduler = scheduler
+
+    async def stop(self) -> None:
+        if self._scheduler is None:
+            return
+        self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+        try:
+            await self.lock.release()
+        except Exception:
+            logger.exception("Scheduler lock release failed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        jobs = self._scheduler.get_jobs() if self._scheduler is not None else []
+        return {
+            "running": self._scheduler is not None,
+            "leader": self.lock.held,
+            "owner": self.lock.owner,
+            "jobs": {
+                job.id: job.next_run_time.isoformat() if job.next_run_time else None
+                for job in jobs
+                if job.id in self._jobs
+            },
+        }
+
+
+scheduler = JobScheduler()
@@ -1,20 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 import bcrypt
 from app.core.config import settings
 
 
+class PasswordHashMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_seconds_total": self.queue_seconds_total,
+            "queue_seconds_max": self.queue_seconds_max,
+            "hash_seconds_total": self.hash_seconds_total,
+        }
+
+
+password_hash_metrics = PasswordHashMetrics()
+_hash_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+    thread_name_prefix="password-hash",
+)
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
 def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def _busy() -> HTTPException:
+    password_hash_metrics.rejected += 1
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _run_password_job(func: Callable[..., Any], *args: Any) -> Any:
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(max(1, settings.PASSWORD_HASH_WORKERS))
+    if _hash_slots.locked() and password_hash_metrics.waiting >= settings.PASSWORD_HASH_MAX_QUEUE:
+        raise _busy()
+
+    queued_at = time.perf_counter()
+    password_hash_metrics.waiting += 1
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise _busy()
+    finally:
+        password_hash_metrics.waiting -= 1
+
+    queue_seconds = time.perf_counter() - queued_at
+    password_hash_metrics.queue_seconds_total += queue_seconds
+    password_hash_metrics.queue_seconds_max = max(password_hash_metrics.queue_seconds_max, queue_seconds)
+    password_hash_metrics.in_flight += 1
+    started_at = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        password_hash_metrics.hash_seconds_total += time.perf_counter() - started_at
+        password_hash_metrics.in_flight -= 1
+        password_hash_metrics.completed += 1
+        _hash_slots.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run_password_job(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+NOT_DELETED: Dict[str, Any] = {"deleted_at": None}
+PENDING_PURGE: Dict[str, Any] = {"deleted_at": {"$type": "date"}}
+
+HABIT_PROJECTION = {
+    "user_id": 1,
+    "name": 1,
+    "type": 1,
+    "frequency": 1,
+    "schedule": 1,
+    "time_of_day": 1,
+    "start_date": 1,
+    "goal": 1,
+    "color": 1,
+    "icon": 1,
+    "category": 1,
+    "order": 1,
+    "archived": 1,
+    "created_at": 1,
+}
+
+CHECKIN_PROJECTION = {
+    "user_id": 1,
+    "habit_id": 1,
+    "date": 1,
+    "completed": 1,
+    "value": 1,
+    "skipped": 1,
+    "created_at": 1,
+}
+
+
+def _as_date(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def habit_to_json(h: Dict[str, Any], current_streak: Optional[int] = 0) -> Dict[str, Any]:
+    return {
+        "id": str(h["_id"]),
+        "user_id": str(h["user_id"]),
+        "name": h["name"],
+        "type": h["type"],
+        "frequency": h["frequency"],
+        "schedule": h.get("schedule"),
+        "time_of_day": h.get("time_of_day"),
+        "start_date": h["start_date"],
+        "goal": h.get("goal"),
+        "color": h.get("color", "#3B82F6"),
+        "icon": h.get("icon"),
+        "category": h.get("category"),
+        "order": h.get("order", 0),
+        "archived": h.get("archived", False),
+        "created_at": h.get("created_at") or datetime.utcnow(),
+        "current_streak": current_streak,
+    }
+
+
+def checkin_to_json(c: Dict[str, Any]) -> Dict[str, Any]:
+    value = c.get("value")
+    return {
+        "id": str(c["_id"]),
+        "user_id": str(c["user_id"]),
+        "habit_id": str(c["habit_id"]),
+        "date": _as_date(c["date"]),
+        "completed": c["completed"],
+        "value": float(value) if value is not None else None,
+        "skipped": c.get("skipped", False),
+        "created_at": c.get("created_at") or datetime.utcnow(),
+    }
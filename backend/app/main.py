@@ -1,12 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
+import logging
 import os
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
-from app.api.v1 import auth, habits, checkins, analytics
+from app.core import database
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.indexes import ensure_indexes, index_drift
+from app.core.metrics import CONTENT_TYPE, render_metrics
+from app.core.middleware import ETagMiddleware, MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.response_cache import response_cache
+from app.core.scheduler import scheduler
+from app.core.security import password_hash_metrics
+from app.api.v1 import auth, habits, checkins, analytics, health, profiling
+from app.services.maintenance_service import register_jobs
+from app.services.migration_service import run_migrations
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,12 +33,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id"],
 )
+app.add_middleware(ETagMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["auth"])
 app.include_router(habits.router, prefix=f"{settings.API_V1_PREFIX}/habits", tags=["habits"])
 app.include_router(checkins.router, prefix=f"{settings.API_V1_PREFIX}/checkins", tags=["checkins"])
 app.include_router(analytics.router, prefix=f"{settings.API_V1_PREFIX}/analytics", tags=["analytics"])
+app.include_router(health.router, prefix=f"{settings.API_V1_PREFIX}/health", tags=["health"])
+if settings.PROFILING_ENABLED:
+    app.include_router(profiling.router, prefix=f"{settings.API_V1_PREFIX}/debug/profiles", tags=["debug"])
 
 frontend_dist = Path("/app/frontend/dist")
 if not frontend_dist.exists():
@@ -40,13 +61,35 @@ if frontend_dist.exists():
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
+    if settings.MONGODB_ENSURE_INDEXES:
+        await ensure_indexes(get_database())
+        for collection, report in (await index_drift(get_database())).items():
+            logger.warning("Index drift on %s: %s", collection, report)
+    if settings.MONGODB_RUN_MIGRATIONS:
+        await run_migrations()
+    if settings.SCHEDULER_ENABLED:
+        register_jobs(scheduler)
+        await scheduler.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await scheduler.stop()
     await close_mongo_connection()
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(
+        content=render_metrics({
+            "mongo_pool": database.pool_metrics.snapshot(),
+            "password_hash": password_hash_metrics.snapshot(),
+            "response_cache": response_cache.metrics.snapshot(),
+        }),
+        media_type=CONTENT_TYPE,
+    )
+
+
 @app.get("/")
 async def root():
     if frontend_dist.exists():
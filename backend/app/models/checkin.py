@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, date
 from bson import ObjectId
 
@@ -38,3 +38,24 @@ class CheckinResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class DayCompletion(BaseModel):
+    completed: bool
+    ratio: float
+    scheduled: int
+
+
+class CheckinBulkCreate(BaseModel):
+    checkins: List[CheckinCreate] = Field(..., min_length=1, max_length=500)
+
+
+class CheckinBulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class CheckinBulkResponse(BaseModel):
+    results: List[CheckinBulkItemResult]
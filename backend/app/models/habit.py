@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from bson import ObjectId
@@ -17,7 +17,7 @@ class Habit(BaseModel):
     color: str = "#3B82F6"
     icon: Optional[str] = None
     category: Optional[str] = None
-    order: int = 0
+    order: float = 0
     archived: bool = False
     created_at: datetime = datetime.utcnow()
 
@@ -48,10 +48,14 @@ class HabitUpdate(BaseModel):
     color: Optional[str] = None
     icon: Optional[str] = None
     category: Optional[str] = None
-    order: Optional[int] = None
+    order: Optional[float] = None
     archived: Optional[bool] = None
 
 
+class HabitOrderUpdate(BaseModel):
+    habit_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class HabitResponse(BaseModel):
     id: str
     user_id: str
@@ -65,7 +69,7 @@ class HabitResponse(BaseModel):
     color: str
     icon: Optional[str] = None
     category: Optional[str] = None
-    order: int
+    order: float
     archived: bool
     created_at: datetime
     current_streak: Optional[int] = 0
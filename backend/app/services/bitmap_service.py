@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+from app.core.indexes import ensure_indexes
+from app.core.serialization import PENDING_PURGE
+
+WORD_BITS = 64
+WORDS = 6
+_WORD_MASK = (1 << WORD_BITS) - 1
+_SIGN_BIT = 1 << (WORD_BITS - 1)
+REBUILD_BATCH_SIZE = 500
+
+
+def _signed(word: int) -> Int64:
+    word &= _WORD_MASK
+    return Int64(word - (1 << WORD_BITS) if word & _SIGN_BIT else word)
+
+
+def day_index(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def _key(user_id: ObjectId, habit_id: ObjectId, year: int) -> Dict[str, Any]:
+    return {"user_id": user_id, "habit_id": habit_id, "year": year}
+
+
+def bitmap_update(day: date, checkin: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    index = day_index(day)
+    word, bit = divmod(index, WORD_BITS)
+    mask = 1 << bit
+    checkin = checkin or {}
+    bits = {}
+    for field in ("completed", "skipped"):
+        if checkin.get(field):
+            bits[f"{field}.w{word}"] = {"or": _signed(mask)}
+        else:
+            bits[f"{field}.w{word}"] = {"and": _signed(~mask)}
+    update: Dict[str, Any] = {"$bit": bits}
+    value = checkin.get("value")
+    if value is not None:
+        update["$set"] = {f"values.{index}": float(value)}
+    else:
+        update["$unset"] = {f"values.{index}": ""}
+    return update
+
+
+async def record_checkin_bitmap(
+    user_id: ObjectId,
+    habit_id: ObjectId,
+    day: date,
+    checkin: Optional[Dict[str, Any]],
+) -> None:
+    db = get_database()
+    await db.completion_bitmaps.update_one(_key(user_id, habit_id, day.year), bitmap_update(day, checkin), upsert=True)
+
+
+async def record_checkin_bitmaps(
+    user_id: ObjectId,
+    changes: List[Tuple[ObjectId, date, Optional[Dict[str, Any]]]],
+) -> None:
+    writes = [
+        UpdateOne(_key(user_id, habit_id, day.year), bitmap_update(day, checkin), upsert=True)
+        for habit_id, day, checkin in changes
+    ]
+    if writes:
+        db = get_database()
+        await db.completion_bitmaps.bulk_write(writes, ordered=True)
+
+
+async def remove_habit_bitmaps(user_id: ObjectId, habit_id: ObjectId) -> None:
+    db = get_database()
+    await db.completion_bitmaps.delete_many({"user_id": user_id, "habit_id": habit_id})
+
+
+def year_bits(doc: Dict[str, Any], field: str) -> np.ndarray:
+    stored = doc.get(field) or {}
+    words = np.array([int(stored.get(f"w{i}", 0)) & _WORD_MASK for i in range(WORDS)], dtype="<u8")
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little").astype(bool)
+    days = (date(doc["year"] + 1, 1, 1) - date(doc["year"], 1, 1)).days
+    return bits[:days]
+
+
+def completed_ordinals(doc: Dict[str, Any]) -> np.ndarray:
+    done = year_bits(doc, "completed") & ~year_bits(doc, "skipped")
+    return np.flatnonzero(done).astype(np.int64) + date(doc["year"], 1, 1).toordinal()
+
+
+async def fetch_completed_ordinals(
+    user_id: ObjectId,
+    habit_ids: List[ObjectId],
+    as_of_date: Optional[date] = None,
+) -> Dict[ObjectId, np.ndarray]:
+    result: Dict[ObjectId, np.ndarray] = {habit_id: np.empty(0, dtype=np.int64) for habit_id in habit_ids}
+    if not habit_ids:
+        return result
+    query: Dict[str, Any] = {"user_id": user_id, "habit_id": {"$in": list(habit_ids)}}
+    if as_of_date is not None:
+        query["year"] = {"$lte": as_of_date.year}
+    db = get_database()
+    docs = await db.completion_bitmaps.find(
+        query,
+        {"_id": 0, "habit_id": 1, "year": 1, "completed": 1, "skipped": 1},
+    ).sort("year", 1).to_list(length=None)
+    parts: Dict[ObjectId, List[np.ndarray]] = {}
+    for doc in docs:
+        parts.setdefault(doc["habit_id"], []).append(completed_ordinals(doc))
+    for habit_id, arrays in parts.items():
+        ordinals = np.concatenate(arrays)
+        if as_of_date is not None:
+            ordinals = ordinals[ordinals <= as_of_date.toordinal()]
+        result[habit_id] = ordinals
+    return result
+
+
+def _words(indexes: List[int]) -> Dict[str, Int64]:
+    words = [0] * WORDS
+    for index in indexes:
+        word, bit = divmod(index, WORD_BITS)
+        words[word] |= 1 << bit
+    return {f"w{i}": _signed(word) for i, word in enumerate(words) if word}
+
+
+def _bitmap_doc(group: Dict[str, Any]) -> Dict[str, Any]:
+    entries = group["entries"]
+    return {
+        **_key(group["_id"]["user_id"], group["_id"]["habit_id"], group["_id"]["year"]),
+        "completed": _words([e["index"] for e in entries if e.get("completed")]),
+        "skipped": _words([e["index"] for e in entries if e.get("skipped")]),
+        "values": {str(e["index"]): float(e["value"]) for e in entries if e.get("value") is not None},
+    }
+
+
+def _history_pipeline(scope: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {**scope, "date": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "habit_id": "$habit_id", "year": {"$year": "$date"}},
+            "entries": {"$push": {
+                "index": {"$subtract": [{"$dayOfYear": "$date"}, 1]},
+                "completed": "$completed",
+                "skipped": "$skipped",
+                "value": "$value",
+            }},
+        }},
+    ]
+
+
+async def rebuild(user_id: Optional[ObjectId] = None) -> int:
+    db = get_database()
+    scope: Dict[str, Any] = {"user_id": user_id} if user_id is not None else {}
+    await db.completion_bitmaps.delete_many(scope)
+    cursor = db.checkins.aggregate(_history_pipeline(scope))
+    written = 0
+    writes: List[ReplaceOne] = []
+    async for group in cursor:
+        doc = _bitmap_doc(group)
+        writes.append(ReplaceOne(_key(doc["user_id"], doc["habit_id"], doc["year"]), doc, upsert=True))
+        if len(writes) >= REBUILD_BATCH_SIZE:
+            await db.completion_bitmaps.bulk_write(writes, ordered=False)
+            written += len(writes)
+            writes = []
+    if writes:
+        await db.completion_bitmaps.bulk_write(writes, ordered=False)
+        written += len(writes)
+    return written
+
+
+def _word_values(stored: Optional[Dict[str, Any]]) -> List[int]:
+    stored = stored or {}
+    return [int(stored.get(f"w{i}", 0)) & _WORD_MASK for i in range(WORDS)]
+
+
+def _bitmap_differs(stored: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    return (
+        any(_word_values(stored.get(field)) != _word_values(expected[field]) for field in ("completed", "skipped"))
+        or {k: float(v) for k, v in (stored.get("values") or {}).items()} != expected["values"]
+    )
+
+
+def _observed(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {"_id": doc["_id"], "completed": doc.get("completed"), "skipped": doc.get("skipped"), "values": doc.get("values")}
+
+
+async def refresh(user_id: ObjectId) -> int:
+    db = get_database()
+    stored = {
+        (doc["habit_id"], doc["year"]): doc
+        async for doc in db.completion_bitmaps.find({"user_id": user_id})
+    }
+    writes: List[Any] = []
+    scope: Dict[str, Any] = {"user_id": user_id}
+    pending = await db.habits.distinct("_id", {**scope, **PENDING_PURGE})
+    if pending:
+        scope["habit_id"] = {"$nin": pending}
+    async for group in db.checkins.aggregate(_history_pipeline(scope)):
+        expected = _bitmap_doc(group)
+        current = stored.pop((expected["habit_id"], expected["year"]), None)
+        if current is None:
+            writes.append(UpdateOne(
+                _key(user_id, expected["habit_id"], expected["year"]),
+                {"$setOnInsert": {f: expected[f] for f in ("completed", "skipped", "values")}},
+                upsert=True,
+            ))
+        elif _bitmap_differs(current, expected):
+            writes.append(ReplaceOne(_observed(current), expected))
+    writes.extend(DeleteOne(_observed(current)) for current in stored.values())
+    if writes:
+        await db.completion_bitmaps.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def _run(user: Optional[str]) -> None:
+    await connect_to_mongo()
+    try:
+        await ensure_indexes(get_database())
+        print(f"completion_bitmaps: {await rebuild(ObjectId(user) if user else None)} documents")
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.bitmap_service")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user", help="Rebuild a single user's bitmaps")
+    args = parser.parse_args()
+    asyncio.run(_run(args.user))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List
+import numpy as np
+from app.services.schedule_service import CompiledSchedule, compile_schedule
+
+
+def _to_date(value: Any):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+
+@dataclass
+class CompletionMatrix:
+    start_date: date
+    habit_ids: List[str]
+    scheduled: np.ndarray
+    completed: np.ndarray
+
+    @property
+    def days(self) -> List[date]:
+        return [self.start_date + timedelta(days=i) for i in range(self.scheduled.shape[1])]
+
+    @property
+    def scheduled_count(self) -> np.ndarray:
+        return self.scheduled.sum(axis=0)
+
+    @property
+    def done_count(self) -> np.ndarray:
+        return (self.scheduled & self.completed).sum(axis=0)
+
+    @property
+    def all_done(self) -> np.ndarray:
+        scheduled_count = self.scheduled_count
+        return (scheduled_count > 0) & (self.done_count == scheduled_count)
+
+    @property
+    def ratio(self) -> np.ndarray:
+        scheduled_count = self.scheduled_count
+        return np.divide(
+            self.done_count,
+            scheduled_count,
+            out=np.zeros(scheduled_count.shape, dtype=float),
+            where=scheduled_count > 0,
+        )
+
+
+def scheduled_row(matcher: CompiledSchedule, ordinals: np.ndarray) -> np.ndarray:
+    if matcher.mode == "all_time":
+        return np.ones(ordinals.shape, dtype=bool)
+    row = np.ones(ordinals.shape, dtype=bool)
+    if matcher.start is not None:
+        row &= ordinals >= matcher.start
+    if matcher.mode in ("date_range", "days_21"):
+        if matcher.end is not None:
+            row &= ordinals <= matcher.end
+    elif matcher.mode == "weekdays":
+        row &= ((matcher.weekday_mask >> ((ordinals - 1) % 7)) & 1).astype(bool)
+    elif matcher.mode == "specific_dates":
+        row &= np.isin(ordinals, np.fromiter(matcher.dates, dtype=np.int64, count=len(matcher.dates)))
+    return row
+
+
+def build_completion_matrix(
+    habits: List[Dict[str, Any]],
+    checkins: Iterable[Dict[str, Any]],
+    start_date: date,
+    end_date: date,
+) -> CompletionMatrix:
+    day_count = max((end_date - start_date).days + 1, 0)
+    ordinals = np.arange(start_date.toordinal(), start_date.toordinal() + day_count, dtype=np.int64)
+    habit_ids = [str(h["_id"]) for h in habits]
+    scheduled = np.zeros((len(habits), day_count), dtype=bool)
+    for i, h in enumerate(habits):
+        scheduled[i] = scheduled_row(compile_schedule(h.get("schedule")), ordinals)
+
+    row_by_habit = {hid: i for i, hid in enumerate(habit_ids)}
+    rows: List[int] = []
+    cols: List[int] = []
+    for c in checkins:
+        row = row_by_habit.get(str(c["habit_id"]))
+        d = _to_date(c.get("date"))
+        if row is None or d is None:
+            continue
+        col = (d - start_date).days
+        if 0 <= col < day_count:
+            rows.append(row)
+            cols.append(col)
+    completed = np.zeros((len(habits), day_count), dtype=bool)
+    if rows:
+        completed[np.asarray(rows), np.asarray(cols)] = True
+    return CompletionMatrix(start_date=start_date, habit_ids=habit_ids, scheduled=scheduled, completed=completed)
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from bson import ObjectId
+from app.core.config import settings
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+from app.core.indexes import ensure_indexes
+from app.core.scheduler import JobScheduler
+from app.services import bitmap_service, rollup_service
+from app.services.purge_service import NOT_DELETED, purge_deleted_habits
+from app.services.streak_service import repair_streaks, rollover_streaks
+from app.services.version_service import bump_data_version
+
+REPAIR_STATE_ID = "repair"
+
+
+async def rollover(as_of_date: Optional[date] = None) -> Dict[str, Any]:
+    return {"streaks_reset": await rollover_streaks(as_of_date)}
+
+
+async def refresh_rollups(days: Optional[int] = None, user_id: Optional[ObjectId] = None) -> Dict[str, Any]:
+    days = days or settings.SCHEDULER_ROLLUP_DAYS
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    if user_id is not None:
+        return {"days": days, "users": 1, "daily_stats": await rollup_service.refresh(user_id, start_date, end_date)}
+    db = get_database()
+    users = 0
+    repaired = 0
+    async for user in db.users.find({}, {"_id": 1}).sort("_id", 1):
+        repaired += await rollup_service.refresh(user["_id"], start_date, end_date)
+        users += 1
+    return {"days": days, "users": users, "daily_stats": repaired}
+
+
+async def repair_user(user_id: ObjectId) -> int:
+    db = get_database()
+    habits = await db.habits.find({"user_id": user_id, **NOT_DELETED}, {"frequency": 1}).to_list(length=None)
+    repaired = await bitmap_service.refresh(user_id)
+    repaired += await rollup_service.refresh(user_id)
+    repaired += await repair_streaks(user_id, [(h["_id"], h.get("frequency") or "daily") for h in habits])
+    await rollover_streaks(user_id=user_id)
+    if repaired:
+        await bump_data_version(user_id)
+    return repaired
+
+
+async def repair(limit: Optional[int] = None) -> Dict[str, Any]:
+    limit = limit or settings.SCHEDULER_REPAIR_BATCH_USERS
+    db = get_database()
+    state = await db.scheduler_state.find_one({"_id": REPAIR_STATE_ID}) or {}
+    after = state.get("last_user_id")
+    query = {"_id": {"$gt": after}} if after is not None else {}
+    users = await db.users.find(query, {"_id": 1}).sort("_id", 1).limit(limit).to_list(length=limit)
+    repaired = 0
+    for user in users:
+        repaired += await repair_user(user["_id"])
+    last_user_id = users[-1]["_id"] if len(users) == limit else None
+    await db.scheduler_state.update_one(
+        {"_id": REPAIR_STATE_ID},
+        {"$set": {"last_user_id": last_user_id, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    return {"users": len(users), "repaired": repaired, "wrapped": last_user_id is None}
+
+
+def register_jobs(scheduler: JobScheduler) -> None:
+    scheduler.add_job("streak_rollover", rollover, CronTrigger.from_crontab(settings.SCHEDULER_ROLLOVER_CRON))
+    scheduler.add_job("rollup_refresh", refresh_rollups, CronTrigger.from_crontab(settings.SCHEDULER_ROLLUP_CRON))
+    scheduler.add_job("repair", repair, IntervalTrigger(minutes=settings.SCHEDULER_REPAIR_INTERVAL_MINUTES))
+    scheduler.add_job("habit_purge", purge_deleted_habits, IntervalTrigger(seconds=settings.HABIT_PURGE_INTERVAL_SECONDS))
+
+
+async def _run(command: str, user: Optional[str], days: Optional[int]) -> None:
+    await connect_to_mongo()
+    try:
+        await ensure_indexes(get_database())
+        if command == "rollover":
+            print(await rollover())
+        elif command == "rollups":
+            print(await refresh_rollups(days, ObjectId(user) if user else None))
+        elif user:
+            print({"users": 1, "repaired": await repair_user(ObjectId(user))})
+        else:
+            print(await repair())
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.maintenance_service")
+    parser.add_argument("command", choices=["rollover", "rollups", "repair"])
+    parser.add_argument("--user", help="Limit rollups or repair to a single user")
+    parser.add_argument("--days", type=int, help="Days of rollups to refresh")
+    args = parser.parse_args()
+    asyncio.run(_run(args.command, args.user, args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+from app.core.indexes import backfill_checkin_days, ensure_indexes
+from app.services import bitmap_service
+from app.services.maintenance_service import repair_user
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_days() -> Dict[str, Any]:
+    result = await backfill_checkin_days(get_database())
+    users = result.pop("users")
+    for user_id in users:
+        await repair_user(user_id)
+    return {**result, "repaired_users": len(users)}
+
+
+async def build_completion_bitmaps() -> Dict[str, Any]:
+    db = get_database()
+    users = 0
+    written = 0
+    async for user in db.users.find({}, {"_id": 1}).sort("_id", 1):
+        written += await bitmap_service.refresh(user["_id"])
+        users += 1
+    return {"users": users, "completion_bitmaps": written}
+
+
+MIGRATIONS: List[Tuple[str, Callable[[], Awaitable[Dict[str, Any]]]]] = [
+    ("checkins_day_v1", backfill_days),
+    ("completion_bitmaps_v1", build_completion_bitmaps),
+]
+
+
+async def _claim(name: str, owner: str) -> bool:
+    now = datetime.utcnow()
+    db = get_database()
+    try:
+        await db.migrations.update_one(
+            {"_id": name, "$or": [{"state": "failed"}, {"state": "running", "expires_at": {"$lte": now}}]},
+            {"$set": {
+                "state": "running",
+                "owner": owner,
+                "started_at": now,
+                "expires_at": now + timedelta(seconds=settings.MIGRATION_LOCK_TTL_SECONDS),
+            }},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def _wait_for_claim(name: str, owner: str) -> bool:
+    db = get_database()
+    while not await _claim(name, owner):
+        state = await db.migrations.find_one({"_id": name}, {"state": 1, "owner": 1})
+        if state and state.get("state") == "done":
+            return False
+        logger.info("Waiting for migration %s held by %s", name, state.get("owner") if state else None)
+        await asyncio.sleep(settings.MIGRATION_POLL_SECONDS)
+    return True
+
+
+async def run_migrations() -> Dict[str, str]:
+    db = get_database()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    outcome: Dict[str, str] = {}
+    for name, migrate in MIGRATIONS:
+        if not await _wait_for_claim(name, owner):
+            outcome[name] = "skipped"
+            continue
+        try:
+            result = await migrate()
+        except Exception as exc:
+            logger.exception("Migration %s failed", name)
+            await db.migrations.update_one(
+                {"_id": name, "owner": owner},
+                {"$set": {"state": "failed", "error": repr(exc), "finished_at": datetime.utcnow()}},
+            )
+            raise
+        await db.migrations.update_one(
+            {"_id": name, "owner": owner},
+            {"$set": {"state": "done", "result": result, "finished_at": datetime.utcnow()}, "$unset": {"error": ""}},
+        )
+        logger.info("Migration %s finished: %s", name, result)
+        outcome[name] = "done"
+    return outcome
+
+
+async def _run(command: str) -> None:
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        await ensure_indexes(db)
+        if command == "run":
+            print(await run_migrations())
+        else:
+            states = {doc["_id"]: doc async for doc in db.migrations.find({})}
+            for name, _ in MIGRATIONS:
+                state = states.get(name, {})
+                print(f"{name}: {state.get('state', 'pending')} {state.get('result') or state.get('error') or ''}".rstrip())
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.migration_service")
+    parser.add_argument("command", choices=["run", "status"])
+    args = parser.parse_args()
+    asyncio.run(_run(args.command))
+
+
+if __name__ == "__main__":
+    main()
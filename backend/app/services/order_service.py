@@ -0,0 +1,86 @@
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo import DESCENDING, UpdateOne
+from app.core.database import get_database
+from app.services.purge_service import NOT_DELETED
+
+ORDER_STEP = 1024.0
+MIN_ORDER_GAP = 1e-6
+
+
+def key_between(lower: Optional[float], upper: Optional[float]) -> Optional[float]:
+    if lower is None and upper is None:
+        return ORDER_STEP
+    if lower is None:
+        return upper - ORDER_STEP
+    if upper is None:
+        return lower + ORDER_STEP
+    if upper - lower < MIN_ORDER_GAP:
+        return None
+    key = lower + (upper - lower) / 2
+    return key if lower < key < upper else None
+
+
+def _scope(user_id: ObjectId, archived: bool) -> Dict[str, Any]:
+    return {"user_id": user_id, "archived": archived, **NOT_DELETED}
+
+
+async def next_order(user_id: ObjectId) -> float:
+    db = get_database()
+    last = await db.habits.find_one(_scope(user_id, False), {"order": 1}, sort=[("order", DESCENDING)])
+    return key_between(last.get("order", 0) if last else None, None)
+
+
+async def rebalance(user_id: ObjectId, archived: bool = False) -> int:
+    db = get_database()
+    habits = await db.habits.find(_scope(user_id, archived), {"order": 1}).sort([("order", 1), ("_id", 1)]).to_list(length=None)
+    writes = [
+        UpdateOne({"_id": h["_id"], "user_id": user_id}, {"$set": {"order": (i + 1) * ORDER_STEP}})
+        for i, h in enumerate(habits)
+        if h.get("order") != (i + 1) * ORDER_STEP
+    ]
+    if writes:
+        await db.habits.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def move_habit(user_id: ObjectId, habit_id: ObjectId, after_id: Optional[ObjectId] = None) -> Optional[float]:
+    db = get_database()
+    habit = await db.habits.find_one({"_id": habit_id, "user_id": user_id, **NOT_DELETED}, {"archived": 1})
+    if not habit:
+        return None
+    scope = _scope(user_id, habit.get("archived", False))
+    lower = None
+    following = {**scope, "_id": {"$ne": habit_id}}
+    if after_id is not None:
+        anchor = await db.habits.find_one({**scope, "_id": after_id}, {"order": 1})
+        if not anchor or after_id == habit_id:
+            return None
+        lower = anchor.get("order", 0)
+        following = {**scope, "_id": {"$nin": [habit_id, after_id]}, "order": {"$gte": lower}}
+    upper_doc = await db.habits.find_one(following, {"order": 1}, sort=[("order", 1)])
+    key = key_between(lower, upper_doc.get("order", 0) if upper_doc else None)
+    if key is None:
+        await rebalance(user_id, habit.get("archived", False))
+        return await move_habit(user_id, habit_id, after_id)
+    await db.habits.update_one({"_id": habit_id, "user_id": user_id}, {"$set": {"order": key}})
+    return key
+
+
+async def apply_order(user_id: ObjectId, habit_ids: List[ObjectId]) -> bool:
+    db = get_database()
+    habits = await db.habits.find({"_id": {"$in": habit_ids}, "user_id": user_id, **NOT_DELETED}, {"archived": 1}).to_list(length=None)
+    scopes = {h.get("archived", False) for h in habits}
+    if len(habits) != len(habit_ids) or len(scopes) != 1:
+        return False
+    scope = _scope(user_id, scopes.pop())
+    if await db.habits.count_documents(scope) != len(habit_ids):
+        return False
+    await db.habits.bulk_write(
+        [
+            UpdateOne({**scope, "_id": habit_id}, {"$set": {"order": (i + 1) * ORDER_STEP}})
+            for i, habit_id in enumerate(habit_ids)
+        ],
+        ordered=False,
+    )
+    return True
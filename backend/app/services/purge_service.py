@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from app.core.config import settings
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+from app.core.indexes import ensure_indexes
+from app.core.serialization import NOT_DELETED, PENDING_PURGE
+from app.services import rollup_service
+from app.services.bitmap_service import remove_habit_bitmaps
+from app.services.version_service import bump_data_version
+
+
+async def tombstone_habit(user_id: ObjectId, habit_id: ObjectId) -> bool:
+    db = get_database()
+    result = await db.habits.update_one(
+        {"_id": habit_id, "user_id": user_id, **NOT_DELETED},
+        {"$set": {"deleted_at": datetime.utcnow()}},
+    )
+    if result.matched_count == 0:
+        return False
+    await rollup_service.remove_habit(user_id, habit_id)
+    return True
+
+
+async def deleted_habit_ids(user_id: ObjectId) -> List[ObjectId]:
+    db = get_database()
+    return [h["_id"] for h in await db.habits.find({"user_id": user_id, **PENDING_PURGE}, {"_id": 1}).to_list(length=None)]
+
+
+async def _history_span(habit: Dict[str, Any]) -> Dict[str, Optional[datetime]]:
+    if "purge_span" in habit:
+        return habit["purge_span"]
+    db = get_database()
+    key = {"user_id": habit["user_id"], "habit_id": habit["_id"]}
+    first = await db.checkins.find_one(key, {"date": 1}, sort=[("date", 1)])
+    last = await db.checkins.find_one(key, {"date": 1}, sort=[("date", -1)])
+    span = {"start": first["date"] if first else None, "end": last["date"] if last else None}
+    await db.habits.update_one({"_id": habit["_id"], "user_id": habit["user_id"]}, {"$set": {"purge_span": span}})
+    return span
+
+
+async def purge_habit(habit: Dict[str, Any], batch_size: Optional[int] = None, pause: Optional[float] = None) -> int:
+    batch_size = batch_size or settings.HABIT_PURGE_BATCH_SIZE
+    pause = settings.HABIT_PURGE_BATCH_PAUSE_SECONDS if pause is None else pause
+    db = get_database()
+    user_id = habit["user_id"]
+    key = {"user_id": user_id, "habit_id": habit["_id"]}
+    span = await _history_span(habit)
+    deleted = 0
+    while True:
+        batch = await db.checkins.find(key, {"_id": 1}).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        result = await db.checkins.delete_many({**key, "_id": {"$in": [c["_id"] for c in batch]}})
+        deleted += result.deleted_count
+        await asyncio.sleep(pause)
+    if isinstance(span["start"], datetime) and isinstance(span["end"], datetime):
+        await rollup_service.refresh(user_id, span["start"].date(), span["end"].date())
+    await remove_habit_bitmaps(user_id, habit["_id"])
+    await db.streaks.delete_many(key)
+    await db.habits.delete_one({"_id": habit["_id"], "user_id": user_id, **PENDING_PURGE})
+    await bump_data_version(user_id)
+    return deleted
+
+
+async def purge_deleted_habits(limit: Optional[int] = None) -> Dict[str, Any]:
+    limit = limit or settings.HABIT_PURGE_HABITS_PER_RUN
+    db = get_database()
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.HABIT_PURGE_GRACE_SECONDS)
+    habits = await db.habits.find(
+        {"deleted_at": {**PENDING_PURGE["deleted_at"], "$lte": cutoff}},
+        {"user_id": 1, "purge_span": 1},
+    ).limit(limit).to_list(length=limit)
+    checkins = 0
+    for habit in habits:
+        checkins += await purge_habit(habit)
+    return {"habits": len(habits), "checkins": checkins}
+
+
+async def _run() -> None:
+    await connect_to_mongo()
+    try:
+        await ensure_indexes(get_database())
+        while True:
+            result = await purge_deleted_habits()
+            print(result)
+            if result["habits"] == 0:
+                break
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.purge_service")
+    parser.add_argument("command", choices=["run"])
+    parser.parse_args()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from app.core.database import close_mongo_connection, connect_to_mongo, get_database
+from app.core.indexes import ensure_indexes
+from app.core.serialization import PENDING_PURGE
+
+REFRESH_BATCH_SIZE = 500
+
+
+def _day_fields(day: date) -> Dict[str, Any]:
+    return {"day": day.isoformat(), "date": datetime.combine(day, datetime.min.time())}
+
+
+def _state(checkin: Optional[Dict[str, Any]]) -> Dict[str, bool]:
+    if not checkin:
+        return {"completed": False, "skipped": False}
+    return {"completed": bool(checkin.get("completed")), "skipped": bool(checkin.get("skipped"))}
+
+
+def checkin_delta_update(
+    habit_id: ObjectId,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    old, new = _state(before), _state(after)
+    inc = {
+        field: int(new[field]) - int(old[field])
+        for field in ("completed", "skipped")
+        if new[field] != old[field]
+    }
+    if not inc:
+        return None
+    update: Dict[str, Any] = {"$inc": inc}
+    if new["completed"] and not old["completed"]:
+        update["$addToSet"] = {"completed_habit_ids": habit_id}
+    elif old["completed"] and not new["completed"]:
+        update["$pull"] = {"completed_habit_ids": habit_id}
+    return update
+
+
+async def record_checkin_change(
+    user_id: ObjectId,
+    habit_id: ObjectId,
+    day: date,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+) -> None:
+    update = checkin_delta_update(habit_id, before, after)
+    if update is None:
+        return
+    fields = _day_fields(day)
+    update["$setOnInsert"] = {"date": fields["date"]}
+    db = get_database()
+    await db.daily_stats.update_one({"user_id": user_id, "day": fields["day"]}, update, upsert=True)
+
+
+async def record_checkin_changes(
+    user_id: ObjectId,
+    changes: List[Tuple[ObjectId, date, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+) -> None:
+    writes = []
+    for habit_id, day, before, after in changes:
+        update = checkin_delta_update(habit_id, before, after)
+        if update is None:
+            continue
+        fields = _day_fields(day)
+        update["$setOnInsert"] = {"date": fields["date"]}
+        writes.append(UpdateOne({"user_id": user_id, "day": fields["day"]}, update, upsert=True))
+    if writes:
+        db = get_database()
+        await db.daily_stats.bulk_write(writes, ordered=False)
+
+
+async def remove_habit(user_id: ObjectId, habit_id: ObjectId) -> None:
+    db = get_database()
+    days = await db.checkins.aggregate([
+        {"$match": {"user_id": user_id, "habit_id": habit_id}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+            "completed": {"$sum": {"$cond": ["$completed", 1, 0]}},
+            "skipped": {"$sum": {"$cond": ["$skipped", 1, 0]}},
+        }},
+    ]).to_list(length=None)
+    writes = [
+        UpdateOne(
+            {"user_id": user_id, "day": d["_id"]},
+            {
+                "$inc": {"completed": -d["completed"], "skipped": -d["skipped"]},
+                "$pull": {"completed_habit_ids": habit_id},
+            },
+        )
+        for d in days
+        if d["completed"] or d["skipped"]
+    ]
+    if writes:
+        await db.daily_stats.bulk_write(writes, ordered=False)
+
+
+async def get_daily_stats(user_id: ObjectId, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    db = get_database()
+    return await db.daily_stats.find(
+        {"user_id": user_id, "day": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}},
+        {"_id": 0, "day": 1, "completed": 1, "skipped": 1, "completed_habit_ids": 1},
+    ).sort("day", 1).to_list(length=None)
+
+
+def completed_checkins(stats: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"habit_id": habit_id, "date": s["day"]}
+        for s in stats
+        for habit_id in s.get("completed_habit_ids") or []
+    ]
+
+
+_ROLLUP_STAGES: List[Dict[str, Any]] = [
+    {"$group": {
+        "_id": {
+            "user_id": "$user_id",
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+        },
+        "completed": {"$sum": {"$cond": ["$completed", 1, 0]}},
+        "skipped": {"$sum": {"$cond": ["$skipped", 1, 0]}},
+        "completed_habit_ids": {"$addToSet": {"$cond": ["$completed", "$habit_id", "$$REMOVE"]}},
+    }},
+    {"$project": {
+        "_id": 0,
+        "user_id": "$_id.user_id",
+        "day": "$_id.day",
+        "date": {"$dateFromString": {"dateString": "$_id.day", "format": "%Y-%m-%d"}},
+        "completed": 1,
+        "skipped": 1,
+        "completed_habit_ids": 1,
+    }},
+]
+
+
+async def rebuild(user_id: Optional[ObjectId] = None) -> None:
+    db = get_database()
+    scope: Dict[str, Any] = {"user_id": user_id} if user_id is not None else {}
+    checkins_query = dict(scope)
+    pending = await db.habits.distinct("_id", {**scope, **PENDING_PURGE})
+    if pending:
+        checkins_query["habit_id"] = {"$nin": pending}
+    await db.daily_stats.delete_many(scope)
+    await db.checkins.aggregate([
+        {"$match": checkins_query},
+        *_ROLLUP_STAGES,
+        {"$merge": {
+            "into": "daily_stats",
+            "on": ["user_id", "day"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]).to_list(length=None)
+
+
+_STATS_FIELDS = ("completed", "skipped", "completed_habit_ids")
+
+
+def _observed(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {"_id": doc["_id"], **{field: doc.get(field) for field in _STATS_FIELDS}}
+
+
+def _stats_differ(stored: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    return (
+        (stored.get("completed") or 0) != expected["completed"]
+        or (stored.get("skipped") or 0) != expected["skipped"]
+        or set(stored.get("completed_habit_ids") or []) != set(expected["completed_habit_ids"])
+    )
+
+
+async def _flush(db, writes: List[Any]) -> int:
+    if writes:
+        await db.daily_stats.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def refresh(
+    user_id: ObjectId,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> int:
+    db = get_database()
+    scope: Dict[str, Any] = {"user_id": user_id}
+    stats_query = dict(scope)
+    checkins_query = dict(scope)
+    pending = await db.habits.distinct("_id", {**scope, **PENDING_PURGE})
+    if pending:
+        checkins_query["habit_id"] = {"$nin": pending}
+    if start_date is not None and end_date is not None:
+        stats_query["day"] = {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}
+        checkins_query["date"] = {
+            "$gte": _day_fields(start_date)["date"],
+            "$lt": _day_fields(end_date + timedelta(days=1))["date"],
+        }
+    stored = {
+        doc["day"]: doc
+        async for doc in db.daily_stats.find(stats_query, {"user_id": 1, "day": 1, **{f: 1 for f in _STATS_FIELDS}})
+    }
+    repaired = 0
+    writes: List[Any] = []
+    async for doc in db.checkins.aggregate([{"$match": checkins_query}, *_ROLLUP_STAGES]):
+        current = stored.pop(doc["day"], None)
+        if current is None:
+            writes.append(UpdateOne(
+                {"user_id": doc["user_id"], "day": doc["day"]},
+                {"$setOnInsert": {k: v for k, v in doc.items() if k not in ("user_id", "day")}},
+                upsert=True,
+            ))
+        elif _stats_differ(current, doc):
+            writes.append(ReplaceOne(_observed(current), doc))
+        if len(writes) >= REFRESH_BATCH_SIZE:
+            repaired += await _flush(db, writes)
+            writes = []
+    writes.extend(DeleteOne(_observed(current)) for current in stored.values())
+    return repaired + await _flush(db, writes)
+
+
+async def _run(user: Optional[str]) -> None:
+    await connect_to_mongo()
+    try:
+        await ensure_indexes(get_database())
+        await rebuild(ObjectId(user) if user else None)
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.rollup_service")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user", help="Rebuild a single user's rollup")
+    args = parser.parse_args()
+    asyncio.run(_run(args.user))
+
+
+if __name__ == "__main__":
+    main()
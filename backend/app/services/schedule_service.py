@@ -1,5 +1,9 @@
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
 
 
 def _to_date_str(d: date) -> str:
@@ -80,30 +84,108 @@ def normalize_schedule(schedule: Optional[Dict[str, Any]], today: Optional[date]
     return {"mode": "all_time"}
 
 
-def is_scheduled_on(schedule: Optional[Dict[str, Any]], day: date) -> bool:
-    schedule = normalize_schedule(schedule)
-    mode = schedule.get("mode") or "all_time"
-
-    if mode == "all_time":
+@dataclass(frozen=True)
+class CompiledSchedule:
+    mode: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    weekday_mask: int = 0
+    dates: Tuple[int, ...] = ()
+    date_set: FrozenSet[int] = frozenset()
+
+    def _bounds(self, start: int, end: int) -> Tuple[int, int]:
+        if self.mode == "all_time":
+            return start, end
+        if self.start is not None:
+            start = max(start, self.start)
+        if self.end is not None and self.mode in ("date_range", "days_21"):
+            end = min(end, self.end)
+        return start, end
+
+    def is_scheduled_ordinal(self, ordinal: int) -> bool:
+        if self.mode == "all_time":
+            return True
+        if self.start is not None and ordinal < self.start:
+            return False
+        if self.mode in ("date_range", "days_21"):
+            return self.end is None or ordinal <= self.end
+        if self.mode == "weekdays":
+            return bool(self.weekday_mask >> ((ordinal - 1) % 7) & 1)
+        if self.mode == "specific_dates":
+            return ordinal in self.date_set
         return True
 
-    start = _parse_date(schedule.get("start"))
-    if start and day < start:
-        return False
+    def is_scheduled(self, day: date) -> bool:
+        return self.is_scheduled_ordinal(day.toordinal())
+
+    def count_scheduled(self, start: date, end: date) -> int:
+        lo, hi = self._bounds(start.toordinal(), end.toordinal())
+        if hi < lo:
+            return 0
+        if self.mode == "weekdays":
+            total_days = hi - lo + 1
+            full_weeks, remainder = divmod(total_days, 7)
+            count = full_weeks * bin(self.weekday_mask).count("1")
+            first_weekday = (lo - 1) % 7
+            for offset in range(remainder):
+                if self.weekday_mask >> ((first_weekday + offset) % 7) & 1:
+                    count += 1
+            return count
+        if self.mode == "specific_dates":
+            return bisect_right(self.dates, hi) - bisect_left(self.dates, lo)
+        return hi - lo + 1
+
+    def iter_scheduled(self, start: date, end: date) -> Iterator[date]:
+        lo, hi = self._bounds(start.toordinal(), end.toordinal())
+        if self.mode == "specific_dates":
+            for ordinal in self.dates[bisect_left(self.dates, lo):bisect_right(self.dates, hi)]:
+                yield date.fromordinal(ordinal)
+            return
+        for ordinal in range(lo, hi + 1):
+            if self.mode != "weekdays" or self.weekday_mask >> ((ordinal - 1) % 7) & 1:
+                yield date.fromordinal(ordinal)
+
+
+def _ordinal(value: Any) -> Optional[int]:
+    d = _parse_date(value)
+    return d.toordinal() if d else None
+
+
+@lru_cache(maxsize=4096)
+def _compile_schedule_key(key: str) -> CompiledSchedule:
+    schedule = json.loads(key)
+    if not schedule or not isinstance(schedule, dict):
+        return CompiledSchedule(mode="all_time")
+    mode = schedule.get("mode") or "all_time"
+    start = _ordinal(schedule.get("start"))
 
     if mode in ("date_range", "days_21"):
-        end = _parse_date(schedule.get("end"))
-        if end and day > end:
-            return False
-        return True
+        end = _ordinal(schedule.get("end")) or _ordinal(schedule.get("to")) or _ordinal(schedule.get("until"))
+        return CompiledSchedule(mode=mode, start=start, end=end)
 
     if mode == "weekdays":
-        days = schedule.get("days") or []
-        iso = day.isoweekday()
-        return iso in set(int(x) for x in days if isinstance(x, int) or (isinstance(x, str) and x.isdigit()))
+        mask = 0
+        for x in schedule.get("days") or []:
+            try:
+                v = int(x)
+            except (TypeError, ValueError):
+                continue
+            if 1 <= v <= 7:
+                mask |= 1 << (v - 1)
+        return CompiledSchedule(mode=mode, start=start, weekday_mask=mask)
 
     if mode == "specific_dates":
-        dates = set(schedule.get("dates") or [])
-        return _to_date_str(day) in dates
+        ordinals = {o for o in (_ordinal(x) for x in schedule.get("dates") or schedule.get("days") or []) if o is not None}
+        return CompiledSchedule(mode=mode, start=start, dates=tuple(sorted(ordinals)), date_set=frozenset(ordinals))
+
+    return CompiledSchedule(mode="all_time")
+
 
-    return True
+def compile_schedule(schedule: Optional[Dict[str, Any]]) -> CompiledSchedule:
+    if not schedule or not isinstance(schedule, dict):
+        return _compile_schedule_key("null")
+    return _compile_schedule_key(json.dumps(schedule, sort_keys=True, default=str))
+
+
+def is_scheduled_on(schedule: Optional[Dict[str, Any]], day: date) -> bool:
+    return compile_schedule(schedule).is_scheduled(day)
@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+NO_DATE = 0
+
+
+@dataclass
+class StreakArrays:
+    current: np.ndarray
+    best: np.ndarray
+    last: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.current)
+
+    def last_date(self, i: int) -> Optional[date]:
+        ordinal = int(self.last[i])
+        return date.fromordinal(ordinal) if ordinal != NO_DATE else None
+
+
+def pack_ordinals(groups: Iterable[Iterable[date]]) -> tuple:
+    lengths: List[int] = []
+    flat: List[int] = []
+    for dates in groups:
+        before = len(flat)
+        flat.extend(d.toordinal() for d in dates if d is not None)
+        lengths.append(len(flat) - before)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.asarray(flat, dtype=np.int64), offsets
+
+
+def pack_ordinal_arrays(arrays: Sequence[np.ndarray]) -> tuple:
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    flat = np.concatenate(arrays).astype(np.int64, copy=False) if arrays else np.empty(0, dtype=np.int64)
+    return flat, offsets
+
+
+def _week(ordinals: np.ndarray) -> np.ndarray:
+    return (ordinals - 1) // 7
+
+
+def compute_streaks(
+    ordinals: np.ndarray,
+    offsets: np.ndarray,
+    weekly: Union[bool, Sequence[bool], np.ndarray],
+    as_of: Union[int, Sequence[int], np.ndarray],
+) -> StreakArrays:
+    offsets = np.asarray(offsets, dtype=np.int64)
+    habits = len(offsets) - 1
+    weekly = np.broadcast_to(np.asarray(weekly, dtype=bool), (habits,))
+    as_of = np.broadcast_to(np.asarray(as_of, dtype=np.int64), (habits,))
+    current = np.zeros(habits, dtype=np.int64)
+    best = np.zeros(habits, dtype=np.int64)
+    last = np.full(habits, NO_DATE, dtype=np.int64)
+    if habits == 0 or offsets[-1] == 0:
+        return StreakArrays(current, best, last)
+
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    segment = np.repeat(np.arange(habits, dtype=np.int64), np.diff(offsets))
+    keep = ordinals <= as_of[segment]
+    segment = segment[keep]
+    ordinals = ordinals[keep]
+    if ordinals.size == 0:
+        return StreakArrays(current, best, last)
+
+    units = np.where(weekly[segment], _week(ordinals), ordinals)
+    order = np.lexsort((units, segment))
+    segment = segment[order]
+    units = units[order]
+
+    distinct = np.ones(units.size, dtype=bool)
+    distinct[1:] = (segment[1:] != segment[:-1]) | (units[1:] != units[:-1])
+    segment = segment[distinct]
+    units = units[distinct]
+
+    run_start = np.ones(units.size, dtype=bool)
+    run_start[1:] = (segment[1:] != segment[:-1]) | (units[1:] - units[:-1] != 1)
+    run_id = np.cumsum(run_start) - 1
+    run_length = np.bincount(run_id)
+    run_segment = segment[run_start]
+
+    present = np.unique(segment)
+    first_run = np.searchsorted(run_segment, present)
+    best[present] = np.maximum.reduceat(run_length, first_run)
+
+    last_index = np.searchsorted(segment, present, side="right") - 1
+    last_unit = units[last_index]
+    is_weekly = weekly[present]
+    as_of_unit = np.where(is_weekly, _week(as_of[present]), as_of[present])
+    current[present] = np.where(last_unit >= as_of_unit - 1, run_length[run_id[last_index]], 0)
+    last[present] = np.where(is_weekly, last_unit * 7 + 1, last_unit)
+    return StreakArrays(current, best, last)
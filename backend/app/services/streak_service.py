@@ -1,68 +1,61 @@
 from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
 from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
 from app.core.database import get_database
 from app.models.streak import Streak
+from app.services.bitmap_service import fetch_completed_ordinals
+from app.services.streak_engine import compute_streaks, pack_ordinal_arrays
 
 
-async def calculate_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str = "daily", as_of_date: date = None) -> dict:
+def _to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+
+def compute_streak(completed_dates: Iterable[date], frequency: str = "daily", as_of_date: date = None) -> dict:
     if as_of_date is None:
         as_of_date = date.today()
-    
-    db = get_database()
-    as_of_datetime = datetime.combine(as_of_date, datetime.max.time())
-    checkins = await db.checkins.find({
-        "user_id": user_id,
-        "habit_id": habit_id,
-        "completed": True,
-        "skipped": False,
-        "date": {"$lte": as_of_datetime},
-    }).sort("date", -1).to_list(length=1000)
-    
-    if not checkins:
+
+    completed_dates = sorted({d for d in completed_dates if d is not None and d <= as_of_date}, reverse=True)
+
+    if not completed_dates:
         return {"current_streak": 0, "best_streak": 0, "last_checkin_date": None}
-    
-    completed_dates = []
-    for c in checkins:
-        checkin_date = c.get("date")
-        if isinstance(checkin_date, datetime):
-            checkin_date = checkin_date.date()
-        if checkin_date <= as_of_date:
-            completed_dates.append(checkin_date)
-    
-    completed_dates = sorted(set(completed_dates), reverse=True)
-    
+
     if frequency == "weekly":
-        completed_weeks = []
-        for d in completed_dates:
-            week_start = d - timedelta(days=d.weekday())
-            if week_start not in completed_weeks:
-                completed_weeks.append(week_start)
-        completed_weeks = sorted(completed_weeks, reverse=True)
-        
+        completed_weeks = sorted({d - timedelta(days=d.weekday()) for d in completed_dates}, reverse=True)
+
         current_streak = 0
         best_streak = 0
         temp_streak = 0
         as_of_week_start = as_of_date - timedelta(days=as_of_date.weekday())
         prev_week_start = as_of_week_start - timedelta(days=7)
-        
+
         for i, week_start in enumerate(completed_weeks):
             if i == 0:
+                temp_streak = 1
                 if week_start == as_of_week_start or week_start == prev_week_start:
-                    temp_streak = 1
                     current_streak = 1
-                else:
-                    temp_streak = 1
             else:
                 prev_week = completed_weeks[i - 1]
                 weeks_diff = (prev_week - week_start).days // 7
                 if weeks_diff == 1:
                     temp_streak += 1
-                    if week_start == as_of_week_start or week_start == prev_week_start:
-                        current_streak = temp_streak
                 else:
                     temp_streak = 1
+            if current_streak and temp_streak == i + 1:
+                current_streak = temp_streak
             best_streak = max(best_streak, temp_streak)
-        
+
         last_checkin_date = completed_weeks[0] if completed_weeks else None
     else:
         current_streak = 0
@@ -70,7 +63,7 @@ async def calculate_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str
         temp_streak = 0
         yesterday = as_of_date - timedelta(days=1)
         date_set = set(completed_dates)
-        
+
         if as_of_date in date_set or yesterday in date_set:
             start_date = as_of_date if as_of_date in date_set else yesterday
             streak_count = 0
@@ -79,7 +72,7 @@ async def calculate_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str
                 streak_count += 1
                 check_date = check_date - timedelta(days=1)
             current_streak = streak_count
-        
+
         for i, d in enumerate(completed_dates):
             if i == 0:
                 temp_streak = 1
@@ -91,46 +84,317 @@ async def calculate_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str
                 else:
                     temp_streak = 1
             best_streak = max(best_streak, temp_streak)
-        
+
         last_checkin_date = completed_dates[0] if completed_dates else None
-    
+
+    return {
+        "current_streak": current_streak,
+        "best_streak": best_streak,
+        "last_checkin_date": datetime.combine(last_checkin_date, datetime.min.time()) if last_checkin_date else None,
+    }
+
+
+async def fetch_completed_dates(
+    user_id: ObjectId,
+    habit_ids: List[ObjectId],
+    as_of_date: date = None,
+) -> Dict[ObjectId, List[date]]:
+    ordinals = await fetch_completed_ordinals(user_id, habit_ids, as_of_date)
+    return {habit_id: [date.fromordinal(int(o)) for o in values] for habit_id, values in ordinals.items()}
+
+
+async def calculate_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str = "daily", as_of_date: date = None) -> dict:
+    if as_of_date is None:
+        as_of_date = date.today()
+    completed = await fetch_completed_dates(user_id, [habit_id], as_of_date)
+    return compute_streak(completed[habit_id], frequency, as_of_date)
+
+
+def _period_start(d: date, frequency: str) -> date:
+    if frequency == "weekly":
+        return d - timedelta(days=d.weekday())
+    return d
+
+
+def _period_days(frequency: str) -> int:
+    return 7 if frequency == "weekly" else 1
+
+
+def _active_streak(current_streak: int, last_checkin_date: Optional[date], frequency: str) -> int:
+    if last_checkin_date is None:
+        return 0
+    lapsed = (_period_start(date.today(), frequency) - last_checkin_date).days > _period_days(frequency)
+    return 0 if lapsed else current_streak
+
+
+def _streak_fields(current_streak: int, best_streak: int, last_checkin_date: Optional[date], frequency: str) -> dict:
     return {
         "current_streak": current_streak,
+        "active_streak": _active_streak(current_streak, last_checkin_date, frequency),
         "best_streak": best_streak,
         "last_checkin_date": datetime.combine(last_checkin_date, datetime.min.time()) if last_checkin_date else None,
+        "frequency": frequency,
+        "updated_at": datetime.combine(date.today(), datetime.min.time()),
+    }
+
+
+def compute_streak_batch(
+    groups: List[Tuple[np.ndarray, str]],
+    as_of_date: Optional[date] = None,
+) -> List[dict]:
+    ordinals, offsets = pack_ordinal_arrays([values for values, _ in groups])
+    if as_of_date is None:
+        as_of = [int(values.max()) if len(values) else 0 for values, _ in groups]
+    else:
+        as_of = as_of_date.toordinal()
+    arrays = compute_streaks(ordinals, offsets, [frequency == "weekly" for _, frequency in groups], as_of)
+    return [
+        {
+            "current_streak": int(arrays.current[i]),
+            "best_streak": int(arrays.best[i]),
+            "last_checkin_date": _midnight(arrays.last_date(i)),
+        }
+        for i in range(len(arrays))
+    ]
+
+
+def _midnight(d: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(d, datetime.min.time()) if d else None
+
+
+def _rebuilt_fields(ordinals: np.ndarray, frequency: str) -> dict:
+    return _rebuilt_fields_batch([(ordinals, frequency)])[0]
+
+
+def _rebuilt_fields_batch(groups: List[Tuple[np.ndarray, str]]) -> List[dict]:
+    return [
+        _streak_fields(data["current_streak"], data["best_streak"], _to_date(data["last_checkin_date"]), frequency)
+        for data, (_, frequency) in zip(compute_streak_batch(groups), groups)
+    ]
+
+
+def apply_checkin_change(streak: dict, checkin_date: date, completed: bool, frequency: str = "daily") -> Optional[dict]:
+    step = _period_days(frequency)
+    period = _period_start(checkin_date, frequency)
+    last = _to_date(streak.get("last_checkin_date"))
+    current = streak.get("current_streak") or 0
+    best = streak.get("best_streak") or 0
+
+    if completed:
+        if last is None:
+            return _streak_fields(1, max(best, 1), period, frequency)
+        gap = (period - last).days
+        if gap == 0:
+            return _streak_fields(current, best, last, frequency)
+        if gap < 0:
+            if -gap < current * step:
+                return _streak_fields(current, best, last, frequency)
+            return None
+        current = current + 1 if gap == step else 1
+        return _streak_fields(current, max(best, current), period, frequency)
+
+    if last is None:
+        return _streak_fields(current, best, last, frequency)
+    gap = (last - period).days
+    if gap < 0:
+        return _streak_fields(current, best, last, frequency)
+    if gap >= current * step:
+        if best == current:
+            return _streak_fields(current, best, last, frequency)
+        return None
+    if frequency != "weekly" and gap == 0 and 1 < current < best:
+        return _streak_fields(current - 1, best, last - timedelta(days=1), frequency)
+    return None
+
+
+def project_streak(streak: dict, frequency: str = "daily", as_of_date: date = None) -> Optional[dict]:
+    if as_of_date is None:
+        as_of_date = date.today()
+    last = _to_date(streak.get("last_checkin_date"))
+    best = streak.get("best_streak") or 0
+    if last is None:
+        return {"current_streak": 0, "best_streak": best, "last_checkin_date": None}
+    as_of_period = _period_start(as_of_date, frequency)
+    if as_of_period < last:
+        return None
+    if as_of_date == date.today() and "active_streak" in streak:
+        current = streak["active_streak"] or 0
+    else:
+        lapsed = (as_of_period - last).days > _period_days(frequency)
+        current = 0 if lapsed else streak.get("current_streak") or 0
+    return {
+        "current_streak": current,
+        "best_streak": best,
+        "last_checkin_date": streak.get("last_checkin_date"),
+    }
+
+
+async def rebuild_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str = "daily") -> dict:
+    completed = await fetch_completed_ordinals(user_id, [habit_id])
+    fields = _rebuilt_fields(completed[habit_id], frequency)
+    db = get_database()
+    await db.streaks.update_one(
+        {"user_id": user_id, "habit_id": habit_id},
+        {"$set": fields, "$setOnInsert": {"_id": ObjectId()}},
+        upsert=True,
+    )
+    return fields
+
+
+async def rebuild_streaks(user_id: ObjectId, habits: List[Tuple[ObjectId, str]]) -> None:
+    if not habits:
+        return
+    completed = await fetch_completed_ordinals(user_id, [habit_id for habit_id, _ in habits])
+    fields = _rebuilt_fields_batch([(completed[habit_id], frequency or "daily") for habit_id, frequency in habits])
+    db = get_database()
+    await db.streaks.bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "habit_id": habit_id},
+                {"$set": habit_fields, "$setOnInsert": {"_id": ObjectId()}},
+                upsert=True,
+            )
+            for (habit_id, _), habit_fields in zip(habits, fields)
+        ],
+        ordered=False,
+    )
+
+
+async def repair_streaks(user_id: ObjectId, habits: List[Tuple[ObjectId, str]]) -> int:
+    if not habits:
+        return 0
+    db = get_database()
+    habit_ids = [habit_id for habit_id, _ in habits]
+    stored = {
+        s["habit_id"]: s
+        for s in await db.streaks.find({"user_id": user_id, "habit_id": {"$in": habit_ids}}).to_list(length=None)
     }
+    completed = await fetch_completed_ordinals(user_id, habit_ids)
+    fields = _rebuilt_fields_batch([(completed[habit_id], frequency or "daily") for habit_id, frequency in habits])
+    writes = []
+    for habit_id, habit_fields in zip(habit_ids, fields):
+        current = stored.get(habit_id)
+        if current is None:
+            writes.append(UpdateOne(
+                {"user_id": user_id, "habit_id": habit_id},
+                {"$setOnInsert": {**habit_fields, "_id": ObjectId()}},
+                upsert=True,
+            ))
+        elif any(current.get(k) != habit_fields[k] for k in ("current_streak", "best_streak", "last_checkin_date", "frequency")):
+            writes.append(UpdateOne(
+                {
+                    "_id": current["_id"],
+                    "current_streak": current.get("current_streak"),
+                    "best_streak": current.get("best_streak"),
+                    "last_checkin_date": current.get("last_checkin_date"),
+                },
+                {"$set": habit_fields},
+            ))
+    if writes:
+        await db.streaks.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def rollover_streaks(as_of_date: date = None, user_id: Optional[ObjectId] = None) -> int:
+    if as_of_date is None:
+        as_of_date = date.today()
+    scope: Dict[str, Any] = {"user_id": user_id} if user_id is not None else {}
+    writes = []
+    for frequency in ("daily", "weekly"):
+        cutoff = _period_start(as_of_date, frequency) - timedelta(days=_period_days(frequency))
+        writes.append(UpdateMany(
+            {**scope, "frequency": frequency, "active_streak": {"$gt": 0}, "last_checkin_date": {"$lt": _midnight(cutoff)}},
+            {"$set": {"active_streak": 0}},
+        ))
+    db = get_database()
+    result = await db.streaks.bulk_write(writes, ordered=False)
+    return result.modified_count
 
 
 async def update_streak(user_id: ObjectId, habit_id: ObjectId, checkin_date: date, completed: bool, frequency: str = "daily"):
-    streak_data = await calculate_streak(user_id, habit_id, frequency)
-    
     db = get_database()
     streak = await db.streaks.find_one({"user_id": user_id, "habit_id": habit_id})
-    
-    if not streak:
-        streak_dict = {
-            "_id": ObjectId(),
-            "user_id": user_id,
-            "habit_id": habit_id,
-            "current_streak": streak_data["current_streak"],
-            "best_streak": streak_data["best_streak"],
-            "last_checkin_date": streak_data["last_checkin_date"],
-            "updated_at": datetime.combine(date.today(), datetime.min.time()),
-        }
-        await db.streaks.insert_one(streak_dict)
-    else:
-        await db.streaks.update_one(
-            {"user_id": user_id, "habit_id": habit_id},
-            {
-                "$set": {
-                    "current_streak": streak_data["current_streak"],
-                    "best_streak": streak_data["best_streak"],
-                    "last_checkin_date": streak_data["last_checkin_date"],
-                    "updated_at": datetime.combine(date.today(), datetime.min.time()),
-                }
-            },
-        )
+    if not streak or streak.get("frequency") != frequency:
+        await rebuild_streak(user_id, habit_id, frequency)
+        return
+
+    fields = apply_checkin_change(streak, checkin_date, completed, frequency)
+    if fields is None:
+        await rebuild_streak(user_id, habit_id, frequency)
+        return
+
+    result = await db.streaks.update_one(
+        {
+            "_id": streak["_id"],
+            "current_streak": streak.get("current_streak"),
+            "last_checkin_date": streak.get("last_checkin_date"),
+        },
+        {"$set": fields},
+    )
+    if result.matched_count == 0:
+        await rebuild_streak(user_id, habit_id, frequency)
 
 
 async def get_streak(user_id: ObjectId, habit_id: ObjectId, frequency: str = "daily", as_of_date: date = None) -> dict:
-    return await calculate_streak(user_id, habit_id, frequency, as_of_date)
+    if as_of_date is None:
+        as_of_date = date.today()
+    db = get_database()
+    streak = await db.streaks.find_one({"user_id": user_id, "habit_id": habit_id})
+    if not streak or streak.get("frequency") != frequency:
+        streak = await rebuild_streak(user_id, habit_id, frequency)
+    projected = project_streak(streak, frequency, as_of_date)
+    if projected is None:
+        return await calculate_streak(user_id, habit_id, frequency, as_of_date)
+    return projected
+
+
+async def get_streaks(
+    user_id: ObjectId,
+    habits: List[Tuple[ObjectId, str]],
+    as_of_date: date = None,
+) -> Dict[ObjectId, dict]:
+    if as_of_date is None:
+        as_of_date = date.today()
+    if not habits:
+        return {}
+    db = get_database()
+    stored = {
+        s["habit_id"]: s
+        for s in await db.streaks.find(
+            {"user_id": user_id, "habit_id": {"$in": [habit_id for habit_id, _ in habits]}}
+        ).to_list(length=None)
+    }
+
+    result: Dict[ObjectId, dict] = {}
+    stale: List[Tuple[ObjectId, str]] = []
+    for habit_id, frequency in habits:
+        frequency = frequency or "daily"
+        streak = stored.get(habit_id)
+        projected = None
+        if streak and streak.get("frequency") == frequency:
+            projected = project_streak(streak, frequency, as_of_date)
+        if projected is None:
+            stale.append((habit_id, frequency))
+        else:
+            result[habit_id] = projected
+
+    if stale:
+        completed = await fetch_completed_ordinals(user_id, [habit_id for habit_id, _ in stale])
+        groups = [(completed[habit_id], frequency) for habit_id, frequency in stale]
+        for (habit_id, _), data in zip(stale, compute_streak_batch(groups, as_of_date)):
+            result[habit_id] = data
+        missing = [
+            i for i, (habit_id, frequency) in enumerate(stale)
+            if not stored.get(habit_id) or stored[habit_id].get("frequency") != frequency
+        ]
+        writes = [
+            UpdateOne(
+                {"user_id": user_id, "habit_id": stale[i][0]},
+                {"$set": habit_fields, "$setOnInsert": {"_id": ObjectId()}},
+                upsert=True,
+            )
+            for i, habit_fields in zip(missing, _rebuilt_fields_batch([groups[i] for i in missing]))
+        ]
+        if writes:
+            await db.streaks.bulk_write(writes, ordered=False)
+    return result
@@ -0,0 +1,34 @@
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.response_cache import response_cache
+
+_versions = TTLCache(settings.DATA_VERSION_CACHE_SIZE, settings.DATA_VERSION_CACHE_TTL_SECONDS)
+
+
+async def get_data_version(user_id: ObjectId) -> int:
+    version = _versions.get(user_id)
+    if version is not None:
+        return version
+    db = get_database()
+    doc = await db.data_versions.find_one({"_id": user_id}, {"version": 1})
+    version = doc.get("version", 0) if doc else 0
+    _versions.set(user_id, version)
+    return version
+
+
+async def bump_data_version(user_id: ObjectId) -> int:
+    db = get_database()
+    doc = await db.data_versions.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={"version": 1},
+    )
+    version = doc["version"]
+    _versions.set(user_id, version)
+    await response_cache.invalidate(user_id)
+    return version
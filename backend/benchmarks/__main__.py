@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict
+from benchmarks.data import generate
+from benchmarks.micro import run_micro
+from benchmarks.results import build_report, compare, format_comparison, load, save
+
+
+def _print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    for name, result in sorted(results.items()):
+        if "skipped" in result:
+            print(f"{name:<40} skipped ({result['skipped']})")
+            continue
+        if "error" in result:
+            print(f"{name:<40} FAILED ({result['error']})")
+            continue
+        extra = f"  mongo={result['mongo_commands']:.1f}" if "mongo_commands" in result else ""
+        print(f"{name:<40} median {result['median_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms{extra}")
+
+
+def _compare(baseline_path: str, report: Dict[str, Any], threshold: float) -> int:
+    baseline = load(baseline_path)
+    if baseline["meta"].get("params") != report["meta"].get("params"):
+        print("warning: baseline was recorded with different parameters", file=sys.stderr)
+    rows = compare(baseline, report, threshold)
+    print(format_comparison(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def run(args: argparse.Namespace) -> int:
+    dataset = generate(args.seed, args.users, args.habits, args.years)
+    print("dataset:", ", ".join(f"{name}={count}" for name, count in dataset.summary().items()))
+    results: Dict[str, Dict[str, Any]] = {}
+    if args.suite in ("micro", "all"):
+        results.update(run_micro(dataset, args.repeat))
+    if args.suite in ("endpoints", "all"):
+        from benchmarks.endpoints import run_endpoints
+
+        results.update(asyncio.run(run_endpoints(dataset, args.mongo_url, args.requests, args.with_cache)))
+    _print_results(results)
+    params = {
+        "seed": args.seed,
+        "users": args.users,
+        "habits": args.habits,
+        "years": args.years,
+        "suite": args.suite,
+        "mongo": "url" if args.mongo_url else "mongomock",
+        "with_cache": args.with_cache,
+    }
+    report = build_report(results, params)
+    if args.out:
+        save(report, args.out)
+    skipped = sorted(name for name, result in results.items() if "skipped" in result)
+    if skipped:
+        print(f"warning: not measured without --mongo-url: {', '.join(skipped)}", file=sys.stderr)
+    failed = sorted(name for name, result in results.items() if "error" in result)
+    if failed:
+        print(f"error: benchmarks failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    if args.baseline:
+        return _compare(args.baseline, report, args.threshold)
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Generate data and run the benchmarks")
+    run_parser.add_argument("--suite", choices=["micro", "endpoints", "all"], default="all")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--users", type=int, default=3)
+    run_parser.add_argument("--habits", type=int, default=8, help="Habits per user")
+    run_parser.add_argument("--years", type=float, default=3)
+    run_parser.add_argument("--repeat", type=int, default=7, help="Timing rounds per micro-benchmark")
+    run_parser.add_argument("--requests", type=int, default=20, help="Requests per endpoint")
+    run_parser.add_argument("--mongo-url", help="Run endpoint benchmarks against this MongoDB instead of mongomock")
+    run_parser.add_argument("--with-cache", action="store_true", help="Keep the analytics response cache enabled")
+    run_parser.add_argument("--out", help="Write results to this JSON file")
+    run_parser.add_argument("--baseline", help="Compare against a previous results file")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown flagged as a regression")
+
+    compare_parser = sub.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(_compare(args.baseline, load(args.current), args.threshold))
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from app.services.bitmap_service import _bitmap_doc, day_index
+from app.services.schedule_service import compile_schedule
+
+SCHEDULE_MODES: List[Tuple[str, float]] = [
+    ("all_time", 0.5),
+    ("weekdays", 0.25),
+    ("specific_dates", 0.1),
+    ("date_range", 0.1),
+    ("days_21", 0.05),
+]
+FREQUENCIES: List[Tuple[str, float]] = [("daily", 0.8), ("weekly", 0.2)]
+CATEGORIES = ["health", "fitness", "mind", "work", "social", None]
+SKIP_RATE = 0.03
+
+
+@dataclass
+class Dataset:
+    seed: int
+    end_date: date
+    users: List[Dict[str, Any]] = field(default_factory=list)
+    habits: List[Dict[str, Any]] = field(default_factory=list)
+    checkins: List[Dict[str, Any]] = field(default_factory=list)
+    daily_stats: List[Dict[str, Any]] = field(default_factory=list)
+    completion_bitmaps: List[Dict[str, Any]] = field(default_factory=list)
+
+    def collections(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "users": self.users,
+            "habits": self.habits,
+            "checkins": self.checkins,
+            "daily_stats": self.daily_stats,
+            "completion_bitmaps": self.completion_bitmaps,
+        }
+
+    def completed_dates(self, habit_id: ObjectId) -> List[date]:
+        return [
+            c["date"].date()
+            for c in self.checkins
+            if c["habit_id"] == habit_id and c["completed"] and not c["skipped"]
+        ]
+
+    def summary(self) -> Dict[str, int]:
+        return {name: len(docs) for name, docs in self.collections().items()}
+
+
+def _pick(rng: random.Random, choices: List[Tuple[str, float]]) -> str:
+    names, weights = zip(*choices)
+    return rng.choices(names, weights=weights)[0]
+
+
+def _object_id(rng: random.Random) -> ObjectId:
+    return ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+
+
+def _midnight(d: date) -> datetime:
+    return datetime.combine(d, datetime.min.time())
+
+
+def make_schedule(rng: random.Random, mode: str, start: date, end: date) -> Dict[str, Any]:
+    if mode == "weekdays":
+        days = sorted(rng.sample(range(1, 8), rng.randint(2, 5)))
+        return {"mode": "weekdays", "start": start.isoformat(), "days": days}
+    if mode == "specific_dates":
+        span = (end - start).days
+        dates = sorted({start + timedelta(days=rng.randint(0, span)) for _ in range(max(span // 10, 1))})
+        return {"mode": "specific_dates", "start": start.isoformat(), "dates": [d.isoformat() for d in dates]}
+    if mode == "date_range":
+        range_end = start + timedelta(days=rng.randint(30, max((end - start).days, 30)))
+        return {"mode": "date_range", "start": start.isoformat(), "end": range_end.isoformat()}
+    if mode == "days_21":
+        range_start = end - timedelta(days=rng.randint(0, 40))
+        return {"mode": "days_21", "start": range_start.isoformat(), "end": (range_start + timedelta(days=20)).isoformat()}
+    return {"mode": "all_time"}
+
+
+def _history(
+    rng: random.Random,
+    habit: Dict[str, Any],
+    start: date,
+    end: date,
+) -> List[Dict[str, Any]]:
+    matcher = compile_schedule(habit["schedule"])
+    adherence = rng.uniform(0.4, 0.95)
+    momentum = rng.uniform(0.05, 0.2)
+    checkins = []
+    done_last = False
+    for day in matcher.iter_scheduled(start, end):
+        if habit["frequency"] == "weekly" and day.weekday() != rng.randint(0, 6):
+            continue
+        p = min(adherence + momentum, 0.99) if done_last else max(adherence - momentum, 0.01)
+        roll = rng.random()
+        if roll < SKIP_RATE:
+            completed, skipped = False, True
+        elif roll < p:
+            completed, skipped = True, False
+        elif roll < p + 0.1:
+            completed, skipped = False, False
+        else:
+            done_last = False
+            continue
+        done_last = completed
+        goal = habit.get("goal")
+        checkins.append({
+            "_id": _object_id(rng),
+            "user_id": habit["user_id"],
+            "habit_id": habit["_id"],
+            "date": _midnight(day),
+            "day": day.isoformat(),
+            "completed": completed,
+            "value": float(rng.randint(1, goal["value"])) if goal and completed else None,
+            "skipped": skipped,
+            "created_at": _midnight(day) + timedelta(hours=rng.randint(6, 22)),
+        })
+    return checkins
+
+
+def _daily_stats(checkins: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    stats: Dict[Tuple[ObjectId, str], Dict[str, Any]] = {}
+    for c in checkins:
+        key = (c["user_id"], c["day"])
+        row = stats.setdefault(key, {
+            "user_id": c["user_id"],
+            "day": c["day"],
+            "date": c["date"],
+            "completed": 0,
+            "skipped": 0,
+            "completed_habit_ids": [],
+        })
+        if c["completed"]:
+            row["completed"] += 1
+            row["completed_habit_ids"].append(c["habit_id"])
+        if c["skipped"]:
+            row["skipped"] += 1
+    return list(stats.values())
+
+
+def _completion_bitmaps(checkins: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    groups: Dict[Tuple[ObjectId, ObjectId, int], List[Dict[str, Any]]] = {}
+    for c in checkins:
+        day = c["date"].date()
+        groups.setdefault((c["user_id"], c["habit_id"], day.year), []).append({
+            "index": day_index(day),
+            "completed": c["completed"],
+            "skipped": c["skipped"],
+            "value": c["value"],
+        })
+    return [
+        _bitmap_doc({"_id": {"user_id": user_id, "habit_id": habit_id, "year": year}, "entries": entries})
+        for (user_id, habit_id, year), entries in groups.items()
+    ]
+
+
+def generate(
+    seed: int = 42,
+    users: int = 3,
+    habits_per_user: int = 8,
+    years: float = 3,
+    end_date: Optional[date] = None,
+) -> Dataset:
+    rng = random.Random(seed)
+    end = end_date or date.today()
+    history_start = end - timedelta(days=int(365 * years))
+    dataset = Dataset(seed=seed, end_date=end)
+    for u in range(users):
+        user_id = _object_id(rng)
+        dataset.users.append({
+            "_id": user_id,
+            "email": f"bench{u}@example.com",
+            "password_hash": "",
+            "created_at": _midnight(history_start),
+        })
+        for order in range(habits_per_user):
+            start = history_start + timedelta(days=rng.randint(0, max((end - history_start).days // 2, 0)))
+            mode = _pick(rng, SCHEDULE_MODES)
+            habit = {
+                "_id": _object_id(rng),
+                "user_id": user_id,
+                "name": f"Habit {u}-{order}",
+                "type": "positive",
+                "frequency": _pick(rng, FREQUENCIES),
+                "schedule": make_schedule(rng, mode, start, end),
+                "time_of_day": rng.choice(["morning", "afternoon", "evening", None]),
+                "start_date": _midnight(start),
+                "goal": {"value": rng.randint(2, 10), "unit": "times"} if rng.random() < 0.3 else None,
+                "color": "#3B82F6",
+                "icon": None,
+                "category": rng.choice(CATEGORIES),
+                "order": order,
+                "archived": False,
+                "created_at": _midnight(start),
+            }
+            dataset.habits.append(habit)
+            dataset.checkins.extend(_history(rng, habit, start, end))
+    dataset.daily_stats = _daily_stats(dataset.checkins)
+    dataset.completion_bitmaps = _completion_bitmaps(dataset.checkins)
+    return dataset
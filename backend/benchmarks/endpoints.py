@@ -0,0 +1,108 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from app.core import database
+from app.core.config import settings
+from app.core.indexes import ensure_indexes
+from app.core.metrics import http_request_mongo_commands
+from app.core.response_cache import NullResponseCacheBackend, response_cache
+from app.core.security import create_access_token
+from app.main import app
+from benchmarks.data import Dataset
+from benchmarks.results import measure_async
+
+BENCH_DATABASE = "habittracker_bench"
+MONGODB_ONLY = {"analytics.heatmap": "$dateTrunc", "analytics.insights": "$firstN"}
+
+
+async def connect(mongo_url: Optional[str]) -> str:
+    settings.MONGODB_DATABASE = BENCH_DATABASE
+    if mongo_url:
+        settings.MONGODB_URL = mongo_url
+        await database.connect_to_mongo()
+        await database.client.drop_database(BENCH_DATABASE)
+        await ensure_indexes(database.get_database())
+        return "mongodb"
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Endpoint benchmarks need --mongo-url or the mongomock-motor package")
+    database.client = AsyncMongoMockClient()
+    database.database = database.client.get_database(BENCH_DATABASE)
+    database.analytics_database = None
+    return "mongomock"
+
+
+async def seed(dataset: Dataset) -> None:
+    db = database.get_database()
+    for name, docs in dataset.collections().items():
+        if docs:
+            await db[name].insert_many([dict(d) for d in docs])
+
+
+def _requests(dataset: Dataset, user_id) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+    prefix = settings.API_V1_PREFIX
+    end = dataset.end_date
+    habit_id = next(str(h["_id"]) for h in dataset.habits if h["user_id"] == user_id)
+    return [
+        ("habits.list", f"{prefix}/habits/", f"{prefix}/habits/", {}),
+        ("checkins.list", f"{prefix}/checkins/", f"{prefix}/checkins/", {"limit": 200}),
+        ("checkins.today", f"{prefix}/checkins/today", f"{prefix}/checkins/today", {}),
+        (
+            "checkins.day_completion.30d",
+            f"{prefix}/checkins/day-completion",
+            f"{prefix}/checkins/day-completion",
+            {"start_date": (end - timedelta(days=29)).isoformat(), "end_date": end.isoformat()},
+        ),
+        ("analytics.insights", f"{prefix}/analytics/insights", f"{prefix}/analytics/insights", {}),
+        ("analytics.heatmap", f"{prefix}/analytics/heatmap", f"{prefix}/analytics/heatmap", {}),
+        (
+            "analytics.habit",
+            f"{prefix}/analytics/habits/{habit_id}",
+            f"{prefix}/analytics/habits/{{habit_id}}",
+            {"days": 90},
+        ),
+    ]
+
+
+async def run_endpoints(
+    dataset: Dataset,
+    mongo_url: Optional[str] = None,
+    repeat: int = 20,
+    use_cache: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    backend = await connect(mongo_url)
+    if not use_cache:
+        response_cache.backend = NullResponseCacheBackend()
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        await seed(dataset)
+        user_id = dataset.users[0]["_id"]
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for name, path, route, params in _requests(dataset, user_id):
+                async def call():
+                    response = await client.get(path, params=params)
+                    response.raise_for_status()
+                    return response
+
+                if backend == "mongomock" and name in MONGODB_ONLY:
+                    results[name] = {"skipped": f"needs --mongo-url, mongomock lacks {MONGODB_ONLY[name]}"}
+                    continue
+                try:
+                    before = http_request_mongo_commands.totals(("GET", route))
+                    summary = await measure_async(call, repeat)
+                    after = http_request_mongo_commands.totals(("GET", route))
+                except Exception as exc:
+                    results[name] = {"error": f"{type(exc).__name__}: {str(exc)[:120]}"}
+                    continue
+                requests = after[0] - before[0]
+                if backend == "mongodb" and requests:
+                    summary["mongo_commands"] = (after[1] - before[1]) / requests
+                results[name] = summary
+    finally:
+        if backend == "mongodb":
+            await database.client.drop_database(BENCH_DATABASE)
+        await database.close_mongo_connection()
+    return results
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from typing import Any, Dict
+from app.core.serialization import checkin_to_json
+from app.services.completion_service import build_completion_matrix
+from app.services.schedule_service import compile_schedule, is_scheduled_on
+from app.services.streak_engine import compute_streaks, pack_ordinals
+from app.services.streak_service import apply_checkin_change, compute_streak
+from benchmarks.data import Dataset
+from benchmarks.results import measure
+
+
+def _longest_history(dataset: Dataset, frequency: str):
+    habits = [h for h in dataset.habits if h["frequency"] == frequency] or dataset.habits
+    return max(
+        ((h, dataset.completed_dates(h["_id"])) for h in habits),
+        key=lambda item: len(item[1]),
+    )
+
+
+def run_micro(dataset: Dataset, repeat: int = 7, number: int = 10) -> Dict[str, Dict[str, Any]]:
+    end = dataset.end_date
+    year_start = end - timedelta(days=364)
+    year = [year_start + timedelta(days=i) for i in range(365)]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for frequency in ("daily", "weekly"):
+        habit, dates = _longest_history(dataset, frequency)
+        results[f"streak.compute_streak.{frequency}"] = {
+            **measure(lambda: compute_streak(dates, habit["frequency"], end), repeat, number),
+            "items": len(dates),
+        }
+
+    groups = [(h["frequency"] == "weekly", dataset.completed_dates(h["_id"])) for h in dataset.habits]
+    ordinals, offsets = pack_ordinals(dates for _, dates in groups)
+    weekly = [is_weekly for is_weekly, _ in groups]
+    results["streak.engine.all_habits"] = {
+        **measure(lambda: compute_streaks(ordinals, offsets, weekly, end.toordinal()), repeat, number),
+        "items": int(offsets[-1]),
+    }
+
+    habit, dates = _longest_history(dataset, "daily")
+    stored = compute_streak(dates, "daily", end)
+    results["streak.apply_checkin_change"] = {
+        **measure(lambda: apply_checkin_change(stored, end, True, "daily"), repeat, number * 100),
+        "items": 1,
+    }
+
+    schedules = [h["schedule"] for h in dataset.habits]
+    results["schedule.is_scheduled_on.year"] = {
+        **measure(lambda: [is_scheduled_on(s, d) for s in schedules for d in year], repeat, number),
+        "items": len(schedules) * len(year),
+    }
+    results["schedule.count_scheduled.year"] = {
+        **measure(lambda: [compile_schedule(s).count_scheduled(year_start, end) for s in schedules], repeat, number),
+        "items": len(schedules),
+    }
+
+    user_id = dataset.users[0]["_id"]
+    habits = [h for h in dataset.habits if h["user_id"] == user_id]
+    completed = [
+        c for c in dataset.checkins
+        if c["user_id"] == user_id and c["completed"] and c["date"].date() >= year_start
+    ]
+    results["completion.build_completion_matrix.year"] = {
+        **measure(lambda: build_completion_matrix(habits, completed, year_start, end), repeat, number),
+        "items": len(habits) * len(year),
+    }
+
+    sample = dataset.checkins[:1000]
+    results["serialization.checkin_to_json.1000"] = {
+        **measure(lambda: [checkin_to_json(c) for c in sample], repeat, number),
+        "items": len(sample),
+    }
+    return results
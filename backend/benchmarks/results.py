@@ -0,0 +1,104 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def summarize(samples: List[float], per_call: int = 1) -> Dict[str, float]:
+    timings = sorted(s / per_call * 1000 for s in samples)
+    return {
+        "runs": len(timings),
+        "min_ms": timings[0],
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 7, number: int = 10) -> Dict[str, float]:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, number)
+
+
+async def measure_async(fn: Callable[[], Awaitable[Any]], repeat: int = 20) -> Dict[str, float]:
+    await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: Dict[str, Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "params": params,
+        },
+        "results": results,
+    }
+
+
+def save(report: Dict[str, Any], path: str) -> None:
+    Path(path).write_text(json.dumps(report, indent=2, sort_keys=True, default=str))
+
+
+def load(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.15,
+    metric: str = "median_ms",
+) -> List[Dict[str, Any]]:
+    rows = []
+    for name, result in sorted(current["results"].items()):
+        before = baseline["results"].get(name, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        rows.append({
+            "name": name,
+            "before": before,
+            "after": after,
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<40} {'before':>10} {'after':>10} {'change':>8}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['name']:<40} {row['before']:>10.3f} {row['after']:>10.3f} {row['change']:>+7.1%}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,78 @@
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from app.core.serialization import checkin_to_json
+from app.models.checkin import CheckinResponse
+
+
+def make_checkins(count: int) -> List[Dict[str, Any]]:
+    user_id = ObjectId()
+    habit_id = ObjectId()
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "date": start + timedelta(days=i),
+            "day": (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+            "completed": i % 3 != 0,
+            "value": float(i % 5) if i % 2 else None,
+            "skipped": i % 7 == 0,
+            "created_at": start + timedelta(days=i, hours=8),
+        }
+        for i in range(count)
+    ]
+
+
+_response_adapter = TypeAdapter(List[CheckinResponse])
+
+
+def encode_before(checkins: List[Dict[str, Any]]) -> bytes:
+    models = [
+        CheckinResponse(
+            id=str(c["_id"]),
+            user_id=str(c["user_id"]),
+            habit_id=str(c["habit_id"]),
+            date=c["date"].date(),
+            completed=c["completed"],
+            value=c.get("value"),
+            skipped=c.get("skipped", False),
+            created_at=c.get("created_at", datetime.utcnow()),
+        )
+        for c in checkins
+    ]
+    validated = _response_adapter.validate_python([m.model_dump() for m in models])
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def encode_after(checkins: List[Dict[str, Any]]) -> bytes:
+    return ORJSONResponse([checkin_to_json(c) for c in checkins]).body
+
+
+def run(count: int = 1000, repeat: int = 5, number: int = 20) -> Dict[str, float]:
+    checkins = make_checkins(count)
+    results = {}
+    for name, encode in (("before", encode_before), ("after", encode_after)):
+        best = min(timeit.repeat(lambda: encode(checkins), repeat=repeat, number=number)) / number
+        results[name] = best * 1000 * 1000 / count
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--count", type=int, default=1000)
+    args = parser.parse_args()
+    results = run(args.count)
+    for name, ms in results.items():
+        print(f"{name:>6}: {ms:.3f} ms per 1000 check-ins")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+from app.services.streak_engine import compute_streaks, pack_ordinals
+from app.services.streak_service import compute_streak
+from benchmarks.data import generate
+from benchmarks.results import measure
+
+
+def bench(seed: int = 42) -> None:
+    dataset = generate(seed, users=20, habits_per_user=10, years=3)
+    end = dataset.end_date
+    groups = [(h, dataset.completed_dates(h["_id"])) for h in dataset.habits]
+    weekly = [h["frequency"] == "weekly" for h, _ in groups]
+
+    def reference():
+        return [compute_streak(dates, h["frequency"], end) for h, dates in groups]
+
+    def engine():
+        ordinals, offsets = pack_ordinals(dates for _, dates in groups)
+        return compute_streaks(ordinals, offsets, weekly, end.toordinal())
+
+    for name, fn in (("compute_streak", reference), ("streak_engine", engine)):
+        print(f"{name:<16} {measure(fn, repeat=5, number=5)['median_ms']:>9.3f} ms for {len(groups)} habits")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.streaks")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    bench(args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import random
+from datetime import date, timedelta
+from typing import Any, Dict
+import pytest
+from bson.int64 import Int64
+from app.services.bitmap_service import (
+    WORD_BITS,
+    _signed,
+    _words,
+    bitmap_update,
+    completed_ordinals,
+    day_index,
+    year_bits,
+)
+
+MASK = (1 << WORD_BITS) - 1
+
+
+def _apply_bit(doc: Dict[str, Any], update: Dict[str, Any]) -> None:
+    for path, ops in update["$bit"].items():
+        field, word = path.split(".")
+        value = int(doc.setdefault(field, {}).get(word, 0)) & MASK
+        for op, operand in ops.items():
+            value = value | (int(operand) & MASK) if op == "or" else value & (int(operand) & MASK)
+        doc[field][word] = _signed(value)
+
+
+@pytest.mark.parametrize("word", [0, 1, (1 << 62), (1 << 63), (1 << 63) | 5, MASK, -1, -(1 << 63)])
+def test_signed_fits_int64_and_keeps_bits(word):
+    signed = _signed(word)
+    assert isinstance(signed, Int64)
+    assert -(1 << 63) <= signed < (1 << 63)
+    assert int(signed) & MASK == word & MASK
+
+
+@pytest.mark.parametrize("year", [2023, 2024])
+def test_words_round_trip_through_year_bits(year):
+    days = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+    rng = random.Random(year)
+    boundaries = {0, 62, 63, 64, 127, 128, days - 1}
+    for _ in range(20):
+        indexes = sorted(boundaries | set(rng.sample(range(days), rng.randint(0, 60))))
+        bits = year_bits({"year": year, "completed": _words(indexes)}, "completed")
+        assert len(bits) == days
+        assert bits.nonzero()[0].tolist() == indexes
+
+
+def test_completed_ordinals_exclude_skipped_days():
+    completed = [date(2024, 1, 1), date(2024, 3, 4), date(2024, 12, 31)]
+    skipped = [date(2024, 3, 4)]
+    doc = {
+        "year": 2024,
+        "completed": _words([day_index(d) for d in completed]),
+        "skipped": _words([day_index(d) for d in skipped]),
+    }
+    assert completed_ordinals(doc).tolist() == [date(2024, 1, 1).toordinal(), date(2024, 12, 31).toordinal()]
+
+
+def test_incremental_updates_match_rebuilt_words():
+    rng = random.Random(7)
+    start = date(2024, 1, 1)
+    doc: Dict[str, Any] = {"year": 2024}
+    state: Dict[date, Dict[str, Any]] = {}
+    for _ in range(500):
+        day = start + timedelta(days=rng.choice([63, 64, 127, 365, rng.randint(0, 365)]))
+        checkin = rng.choice([None, {"completed": True}, {"completed": True, "skipped": True}, {"completed": False}])
+        _apply_bit(doc, bitmap_update(day, checkin))
+        state[day] = checkin or {}
+    for field in ("completed", "skipped"):
+        expected = _words([day_index(d) for d, c in state.items() if c.get(field)])
+        stored = {word: value for word, value in doc[field].items() if value}
+        assert stored == expected
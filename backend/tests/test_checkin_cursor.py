@@ -0,0 +1,64 @@
+import base64
+import random
+import string
+from datetime import datetime, timedelta
+from typing import Any, Dict
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.api.v1.checkins import _decode_cursor, _encode_cursor
+
+
+def _matches(doc: Dict[str, Any], cursor_filter: Dict[str, Any]) -> bool:
+    for clause in cursor_filter["$or"]:
+        date_cond = clause["date"]
+        date_ok = doc["date"] < date_cond["$lt"] if isinstance(date_cond, dict) else doc["date"] == date_cond
+        id_ok = "_id" not in clause or doc["_id"] < clause["_id"]["$lt"]
+        if date_ok and id_ok:
+            return True
+    return False
+
+
+def test_cursor_round_trip():
+    checkin = {"_id": ObjectId(), "date": datetime(2024, 3, 1, 7, 30, 15, 250000)}
+    cursor = _encode_cursor(checkin)
+    assert set(cursor) <= set(string.ascii_letters + string.digits + "-_=")
+    assert _decode_cursor(cursor) == {
+        "$or": [
+            {"date": {"$lt": checkin["date"]}},
+            {"date": checkin["date"], "_id": {"$lt": checkin["_id"]}},
+        ]
+    }
+
+
+@pytest.mark.parametrize("page_size", [1, 3, 7, 50])
+def test_keyset_pages_cover_every_checkin_once(page_size):
+    rng = random.Random(page_size)
+    base = datetime(2024, 1, 1)
+    docs = [{"_id": ObjectId(), "date": base + timedelta(days=rng.randint(0, 9))} for _ in range(40)]
+    ordered = sorted(docs, key=lambda d: (d["date"], d["_id"]), reverse=True)
+    seen = []
+    cursor = None
+    while True:
+        remaining = [d for d in ordered if cursor is None or _matches(d, _decode_cursor(cursor))]
+        page = remaining[:page_size]
+        seen.extend(page)
+        if len(page) < page_size:
+            break
+        cursor = _encode_cursor(page[-1])
+    assert seen == ordered
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-base64!",
+        base64.urlsafe_b64encode(b"[]").decode(),
+        base64.urlsafe_b64encode(b'{"d": "2024-01-01", "i": "nope"}').decode(),
+        base64.urlsafe_b64encode(b'{"d": "yesterday", "i": "65f000000000000000000000"}').decode(),
+    ],
+)
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor(cursor)
+    assert exc.value.status_code == 400
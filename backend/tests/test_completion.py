@@ -0,0 +1,65 @@
+import random
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from bson import ObjectId
+from app.services.completion_service import build_completion_matrix, scheduled_row
+from app.services.schedule_service import compile_schedule, normalize_schedule
+
+START = date(2024, 2, 20)
+END = date(2024, 4, 10)
+SCHEDULES = [
+    None,
+    {"mode": "days_21"},
+    {"mode": "date_range", "end": "2024-03-05"},
+    {"mode": "weekdays", "days": [1, 4, 7]},
+    {"mode": "weekdays", "days": []},
+    {"mode": "specific_dates", "dates": ["2024-02-21", "2024-03-01", "2024-04-10", "2024-05-01"]},
+]
+
+
+def _habits():
+    return [{"_id": ObjectId(), "schedule": normalize_schedule(s, today=date(2024, 2, 25))} for s in SCHEDULES]
+
+
+def _days():
+    return [START + timedelta(days=i) for i in range((END - START).days + 1)]
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES)
+def test_scheduled_row_matches_is_scheduled(schedule):
+    matcher = compile_schedule(normalize_schedule(schedule, today=date(2024, 2, 25)))
+    ordinals = np.array([d.toordinal() for d in _days()], dtype=np.int64)
+    assert scheduled_row(matcher, ordinals).tolist() == [matcher.is_scheduled(d) for d in _days()]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matrix_matches_per_day_counts(seed):
+    rng = random.Random(seed)
+    habits = _habits()
+    checkins = [
+        {
+            "habit_id": rng.choice(habits)["_id"],
+            "date": datetime.combine(START + timedelta(days=rng.randint(-5, 55)), datetime.min.time()),
+        }
+        for _ in range(120)
+    ]
+    checkins.append({"habit_id": ObjectId(), "date": datetime(2024, 3, 1)})
+    matrix = build_completion_matrix(habits, checkins, START, END)
+
+    assert matrix.days == _days()
+    done = {(str(c["habit_id"]), c["date"].date()) for c in checkins}
+    for col, day in enumerate(_days()):
+        scheduled = [h for h in habits if compile_schedule(h["schedule"]).is_scheduled(day)]
+        completed = [h for h in scheduled if (str(h["_id"]), day) in done]
+        assert matrix.scheduled_count[col] == len(scheduled)
+        assert matrix.done_count[col] == len(completed)
+        assert matrix.all_done[col] == (bool(scheduled) and len(completed) == len(scheduled))
+        assert matrix.ratio[col] == pytest.approx(len(completed) / len(scheduled) if scheduled else 0.0)
+
+
+def test_empty_matrix():
+    matrix = build_completion_matrix([], [], START, START - timedelta(days=1))
+    assert matrix.days == []
+    assert matrix.ratio.shape == (0,)
+    assert matrix.all_done.shape == (0,)
@@ -0,0 +1,29 @@
+import asyncio
+import uuid
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.core.indexes import QUERY_SHAPES, ensure_indexes, find_collection_scans
+
+
+async def _collection_scans() -> list:
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=1000)
+    try:
+        try:
+            await client.admin.command("ping")
+        except PyMongoError:
+            pytest.skip("MongoDB is not reachable at MONGODB_URL")
+        name = f"{settings.MONGODB_DATABASE}_indexes_{uuid.uuid4().hex[:8]}"
+        try:
+            await ensure_indexes(client[name])
+            return await find_collection_scans(client[name])
+        finally:
+            await client.drop_database(name)
+    finally:
+        client.close()
+
+
+def test_query_shapes_are_covered():
+    assert QUERY_SHAPES
+    assert asyncio.run(_collection_scans()) == []
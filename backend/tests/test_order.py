@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.services import order_service
+from app.services.order_service import MIN_ORDER_GAP, ORDER_STEP, key_between, move_habit, rebalance
+
+
+@pytest.mark.parametrize(
+    "lower, upper, expected",
+    [
+        (None, None, ORDER_STEP),
+        (None, 1024.0, 0.0),
+        (2048.0, None, 2048.0 + ORDER_STEP),
+        (1024.0, 2048.0, 1536.0),
+        (-5.0, 5.0, 0.0),
+    ],
+)
+def test_key_between(lower, upper, expected):
+    assert key_between(lower, upper) == expected
+
+
+@pytest.mark.parametrize("gap", [0.0, MIN_ORDER_GAP / 2, 1e-300])
+def test_key_between_reports_exhausted_gap(gap):
+    assert key_between(1024.0, 1024.0 + gap) is None
+
+
+def test_repeated_bisection_stays_strictly_between():
+    lower, upper = 1024.0, 2048.0
+    while (key := key_between(lower, upper)) is not None:
+        assert lower < key < upper
+        upper = key
+    assert upper - lower < MIN_ORDER_GAP * 2
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    database = mongomock_motor.AsyncMongoMockClient()["order_test"]
+    monkeypatch.setattr(order_service, "get_database", lambda: database)
+    return database
+
+
+def _habit(user_id, name, order, archived=False, **fields):
+    return {"user_id": user_id, "name": name, "archived": archived, "deleted_at": None, "order": order, **fields}
+
+
+async def _orders(db, user_id, archived=False):
+    habits = await db.habits.find({"user_id": user_id, "archived": archived}).sort("order", 1).to_list(length=None)
+    return [(h["name"], h["order"]) for h in habits]
+
+
+def test_rebalance_renumbers_only_the_scope(db):
+    async def scenario():
+        user_id = ObjectId()
+        other_user = ObjectId()
+        await db.habits.insert_many([
+            _habit(user_id, "a", 1.0),
+            _habit(user_id, "b", 1.0 + 1e-9),
+            _habit(user_id, "c", 3072.0),
+            _habit(user_id, "z", 7.0, archived=True),
+            _habit(other_user, "x", 1.0),
+        ])
+        assert await rebalance(user_id) == 2
+        assert await _orders(db, user_id) == [("a", 1024.0), ("b", 2048.0), ("c", 3072.0)]
+        assert await _orders(db, user_id, archived=True) == [("z", 7.0)]
+        assert await _orders(db, other_user) == [("x", 1.0)]
+        assert await rebalance(user_id) == 0
+
+    asyncio.run(scenario())
+
+
+def test_move_rebalances_when_gap_is_exhausted(db):
+    async def scenario():
+        user_id = ObjectId()
+        ids = [ObjectId() for _ in range(3)]
+        await db.habits.insert_many([
+            _habit(user_id, "a", 1.0, _id=ids[0]),
+            _habit(user_id, "b", 1.0 + 1e-9, _id=ids[1]),
+            _habit(user_id, "c", 5.0, _id=ids[2]),
+        ])
+        assert await move_habit(user_id, ids[2], ids[0]) == 1536.0
+        assert await _orders(db, user_id) == [("a", 1024.0), ("c", 1536.0), ("b", 2048.0)]
+        assert await move_habit(user_id, ids[0], ids[0]) is None
+        assert await move_habit(user_id, ids[0], ObjectId()) is None
+
+    asyncio.run(scenario())
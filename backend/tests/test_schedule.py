@@ -0,0 +1,80 @@
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List
+import pytest
+from app.services.schedule_service import _parse_date, _to_date_str, compile_schedule, normalize_schedule
+
+TODAY = date(2024, 2, 27)
+WINDOW_START = TODAY - timedelta(days=30)
+WINDOW_END = TODAY + timedelta(days=400)
+
+
+def _reference_is_scheduled(schedule: Dict[str, Any], day: date) -> bool:
+    mode = schedule.get("mode") or "all_time"
+    if mode == "all_time":
+        return True
+    start = _parse_date(schedule.get("start"))
+    if start and day < start:
+        return False
+    if mode in ("date_range", "days_21"):
+        end = _parse_date(schedule.get("end"))
+        return not (end and day > end)
+    if mode == "weekdays":
+        days = schedule.get("days") or []
+        return day.isoweekday() in set(int(x) for x in days if isinstance(x, int) or (isinstance(x, str) and x.isdigit()))
+    if mode == "specific_dates":
+        return _to_date_str(day) in set(schedule.get("dates") or [])
+    return True
+
+
+def _random_schedule(rng: random.Random) -> Dict[str, Any]:
+    mode = rng.choice(["all_time", "days_21", "date_range", "weekdays", "specific_dates"])
+    if mode == "date_range":
+        return {"mode": mode, "end": _to_date_str(TODAY + timedelta(days=rng.randint(-5, 300)))}
+    if mode == "weekdays":
+        return {"mode": mode, "days": rng.sample(range(1, 8), rng.randint(0, 7))}
+    if mode == "specific_dates":
+        offsets = [rng.randint(-10, 380) for _ in range(rng.randint(0, 25))]
+        return {"mode": mode, "dates": [_to_date_str(TODAY + timedelta(days=o)) for o in offsets]}
+    return {"mode": mode}
+
+
+def _random_schedules(seed: int, count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [normalize_schedule(_random_schedule(rng), today=TODAY) for _ in range(count)]
+
+
+def _window() -> List[date]:
+    return [WINDOW_START + timedelta(days=i) for i in range((WINDOW_END - WINDOW_START).days + 1)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_is_scheduled_matches_reference(seed):
+    for schedule in _random_schedules(seed, 40):
+        compiled = compile_schedule(schedule)
+        for day in _window():
+            assert compiled.is_scheduled(day) == _reference_is_scheduled(schedule, day), (schedule, day)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_count_and_iter_match_reference(seed):
+    rng = random.Random(seed)
+    for schedule in _random_schedules(seed, 40):
+        compiled = compile_schedule(schedule)
+        start = WINDOW_START + timedelta(days=rng.randint(0, 200))
+        end = start + timedelta(days=rng.randint(-3, 200))
+        expected = [d for d in _window() if start <= d <= end and _reference_is_scheduled(schedule, d)]
+        assert list(compiled.iter_scheduled(start, end)) == expected, (schedule, start, end)
+        assert compiled.count_scheduled(start, end) == len(expected), (schedule, start, end)
+
+
+def test_empty_and_unknown_schedules_are_always_scheduled():
+    for schedule in (None, {}, {"mode": "unknown"}):
+        compiled = compile_schedule(schedule)
+        assert compiled.mode == "all_time"
+        assert compiled.count_scheduled(TODAY, TODAY + timedelta(days=9)) == 10
+
+
+def test_compiled_schedules_are_cached():
+    schedule = {"mode": "weekdays", "start": "2024-01-01", "days": [1, 3]}
+    assert compile_schedule(schedule) is compile_schedule(dict(reversed(list(schedule.items()))))
@@ -0,0 +1,221 @@
+import random
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+import numpy as np
+import pytest
+from app.services.streak_engine import compute_streaks, pack_ordinal_arrays, pack_ordinals
+from app.services.streak_service import (
+    _to_date,
+    apply_checkin_change,
+    compute_streak,
+    compute_streak_batch,
+    project_streak,
+)
+
+FREQUENCIES = ("daily", "weekly")
+AS_OF = date(2024, 3, 13)
+
+
+def _random_history(rng: random.Random, as_of: date) -> List[date]:
+    span = rng.choice([0, 3, 10, 60, 400])
+    dates = [as_of - timedelta(days=rng.randint(-5, span)) for _ in range(int(span * rng.random()))]
+    if rng.random() < 0.3:
+        dates.extend(as_of - timedelta(days=i) for i in range(rng.randint(0, 20)))
+    if dates and rng.random() < 0.3:
+        dates.extend(rng.choices(dates, k=rng.randint(1, 5)))
+    return dates
+
+
+def _random_cases(seed: int, count: int) -> List[Tuple[List[date], str, date]]:
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        as_of = date(2024, 1, 1) + timedelta(days=rng.randint(0, 400))
+        cases.append((_random_history(rng, as_of), rng.choice(FREQUENCIES), as_of))
+    return cases
+
+
+def _reference(dates: List[date], frequency: str, as_of: date) -> tuple:
+    expected = compute_streak(dates, frequency, as_of)
+    return expected["current_streak"], expected["best_streak"], _to_date(expected["last_checkin_date"])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_engine_matches_reference(seed):
+    cases = _random_cases(seed, 200)
+    ordinals, offsets = pack_ordinals(dates for dates, _, _ in cases)
+    result = compute_streaks(
+        ordinals,
+        offsets,
+        [frequency == "weekly" for _, frequency, _ in cases],
+        [as_of.toordinal() for _, _, as_of in cases],
+    )
+    for i, (dates, frequency, as_of) in enumerate(cases):
+        actual = (int(result.current[i]), int(result.best[i]), result.last_date(i))
+        assert actual == _reference(dates, frequency, as_of), (frequency, as_of, sorted(set(dates)))
+
+
+@pytest.mark.parametrize("frequency", FREQUENCIES)
+def test_engine_empty_histories(frequency):
+    ordinals, offsets = pack_ordinals([[], [AS_OF], []])
+    result = compute_streaks(ordinals, offsets, frequency == "weekly", AS_OF.toordinal())
+    assert result.current.tolist() == [0, 1, 0]
+    assert result.best.tolist() == [0, 1, 0]
+    assert [result.last_date(i) is None for i in range(3)] == [True, False, True]
+
+
+def test_engine_no_habits():
+    ordinals, offsets = pack_ordinals([])
+    assert len(compute_streaks(ordinals, offsets, False, AS_OF.toordinal())) == 0
+
+
+@pytest.mark.parametrize("frequency", FREQUENCIES)
+def test_engine_duplicates_and_future_dates(frequency):
+    dates = [AS_OF, AS_OF, AS_OF - timedelta(days=1), AS_OF - timedelta(days=1), AS_OF + timedelta(days=3)]
+    ordinals, offsets = pack_ordinals([dates])
+    result = compute_streaks(ordinals, offsets, frequency == "weekly", AS_OF.toordinal())
+    assert (int(result.current[0]), int(result.best[0]), result.last_date(0)) == _reference(dates, frequency, AS_OF)
+
+
+def test_engine_gaps():
+    dates = [AS_OF - timedelta(days=d) for d in (0, 1, 2, 5, 6, 7, 8, 20)]
+    ordinals, offsets = pack_ordinals([dates])
+    result = compute_streaks(ordinals, offsets, False, AS_OF.toordinal())
+    assert (int(result.current[0]), int(result.best[0])) == (3, 4)
+    lapsed = compute_streaks(ordinals, offsets, False, (AS_OF + timedelta(days=2)).toordinal())
+    assert (int(lapsed.current[0]), int(lapsed.best[0])) == (0, 4)
+
+
+def test_engine_weekly_gaps():
+    weeks = [AS_OF - timedelta(weeks=w) for w in (0, 1, 3, 4, 5)]
+    ordinals, offsets = pack_ordinals([weeks])
+    result = compute_streaks(ordinals, offsets, True, AS_OF.toordinal())
+    assert (int(result.current[0]), int(result.best[0])) == (2, 3)
+    assert result.last_date(0) == AS_OF - timedelta(days=AS_OF.weekday())
+
+
+def test_batch_defaults_to_each_history_end():
+    dates = [AS_OF - timedelta(days=d) for d in (10, 11, 12)]
+    groups = [(np.array([d.toordinal() for d in dates], dtype=np.int64), "daily"), (np.empty(0, dtype=np.int64), "weekly")]
+    first, empty = compute_streak_batch(groups)
+    assert (first["current_streak"], first["best_streak"]) == (3, 3)
+    assert first["last_checkin_date"] == datetime(2024, 3, 3)
+    assert empty == {"current_streak": 0, "best_streak": 0, "last_checkin_date": None}
+    assert pack_ordinal_arrays([])[1].tolist() == [0]
+
+
+def _stored(dates: List[date], frequency: str) -> dict:
+    if not dates:
+        return {"current_streak": 0, "best_streak": 0, "last_checkin_date": None}
+    return compute_streak(dates, frequency, max(dates))
+
+
+def _summary(streak: dict) -> tuple:
+    return streak["current_streak"], streak["best_streak"], _to_date(streak["last_checkin_date"])
+
+
+def test_apply_first_checkin():
+    fields = apply_checkin_change({}, AS_OF, True)
+    assert _summary(fields) == (1, 1, AS_OF)
+
+
+def test_apply_extends_run():
+    stored = _stored([AS_OF - timedelta(days=2), AS_OF - timedelta(days=1)], "daily")
+    assert _summary(apply_checkin_change(stored, AS_OF, True)) == (3, 3, AS_OF)
+
+
+def test_apply_starts_new_run_after_gap():
+    stored = _stored([AS_OF - timedelta(days=5 + i) for i in range(4)], "daily")
+    assert _summary(apply_checkin_change(stored, AS_OF, True)) == (1, 4, AS_OF)
+
+
+def test_apply_repeat_checkin_is_noop():
+    stored = _stored([AS_OF - timedelta(days=1), AS_OF], "daily")
+    assert _summary(apply_checkin_change(stored, AS_OF, True)) == (2, 2, AS_OF)
+
+
+def test_apply_backfill_outside_run_needs_rebuild():
+    stored = _stored([AS_OF], "daily")
+    assert apply_checkin_change(stored, AS_OF - timedelta(days=1), True) is None
+
+
+def test_apply_uncheck_last_day_shortens_run():
+    stored = _stored([AS_OF - timedelta(days=i) for i in range(3)] + [AS_OF - timedelta(days=10 + i) for i in range(5)], "daily")
+    assert _summary(apply_checkin_change(stored, AS_OF, False)) == (2, 5, AS_OF - timedelta(days=1))
+
+
+def test_apply_uncheck_before_run_keeps_best_run():
+    stored = _stored([AS_OF - timedelta(days=i) for i in range(3)] + [AS_OF - timedelta(days=10)], "daily")
+    assert _summary(apply_checkin_change(stored, AS_OF - timedelta(days=10), False)) == (3, 3, AS_OF)
+
+
+def test_apply_weekly_same_week_is_noop():
+    stored = _stored([AS_OF - timedelta(days=AS_OF.weekday())], "weekly")
+    fields = apply_checkin_change(stored, AS_OF, True, "weekly")
+    assert _summary(fields) == (1, 1, AS_OF - timedelta(days=AS_OF.weekday()))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_apply_matches_full_recompute(seed):
+    rng = random.Random(seed)
+    incremental = 0
+    for dates, frequency, as_of in _random_cases(seed, 400):
+        dates = sorted({d for d in dates if d <= as_of})
+        if dates and rng.random() < 0.5:
+            day, completed = rng.choice(dates), False
+            after = [d for d in dates if d != day]
+        else:
+            day, completed = as_of - timedelta(days=rng.randint(0, 15)), True
+            after = sorted(set(dates) | {day})
+        fields = apply_checkin_change(_stored(dates, frequency), day, completed, frequency)
+        if fields is None:
+            continue
+        incremental += 1
+        assert _summary(fields) == _summary(_stored(after, frequency)), (frequency, dates, day, completed)
+    assert incremental > 100
+
+
+def test_project_lapsed_daily_streak():
+    stored = _stored([AS_OF - timedelta(days=4 + i) for i in range(5)], "daily")
+    last = AS_OF - timedelta(days=4)
+    assert project_streak(stored, "daily", last)["current_streak"] == 5
+    assert project_streak(stored, "daily", last + timedelta(days=1))["current_streak"] == 5
+    assert project_streak(stored, "daily", AS_OF)["current_streak"] == 0
+    assert project_streak(stored, "daily", AS_OF)["best_streak"] == 5
+
+
+def test_project_before_last_checkin_needs_recompute():
+    stored = _stored([AS_OF], "daily")
+    assert project_streak(stored, "daily", AS_OF - timedelta(days=1)) is None
+
+
+def test_project_without_history():
+    assert project_streak({"best_streak": 2}, "daily", AS_OF) == {"current_streak": 0, "best_streak": 2, "last_checkin_date": None}
+
+
+def test_project_weekly():
+    week = AS_OF - timedelta(days=AS_OF.weekday())
+    stored = _stored([week - timedelta(weeks=1), week - timedelta(weeks=2)], "weekly")
+    assert project_streak(stored, "weekly", AS_OF)["current_streak"] == 2
+    assert project_streak(stored, "weekly", AS_OF + timedelta(weeks=1))["current_streak"] == 0
+
+
+def test_project_serves_active_streak_today():
+    today = date.today()
+    stored = {"current_streak": 4, "active_streak": 0, "best_streak": 4, "last_checkin_date": datetime.combine(today - timedelta(days=1), datetime.min.time())}
+    assert project_streak(stored, "daily", today)["current_streak"] == 0
+    assert project_streak(stored, "daily", today - timedelta(days=1))["current_streak"] == 4
+    del stored["active_streak"]
+    assert project_streak(stored, "daily", today)["current_streak"] == 4
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_project_matches_reference(seed):
+    rng = random.Random(seed)
+    for dates, frequency, as_of in _random_cases(seed, 300):
+        if not dates:
+            continue
+        later = max(dates) + timedelta(days=rng.randint(0, 20))
+        projected = project_streak(_stored(dates, frequency), frequency, later)
+        expected = compute_streak(dates, frequency, later)
+        assert (projected["current_streak"], projected["best_streak"]) == (expected["current_streak"], expected["best_streak"])